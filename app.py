@@ -1,15 +1,13 @@
+import os
+# Tek satırlık çıkarımda OpenMP iş parçacığı havuzu kurulumu saf ek yüktür;
+# LightGBM (joblib.load ile) yüklenmeden önce ayarlanmalı.
+os.environ.setdefault('OMP_NUM_THREADS', '1')
+
 import streamlit as st
 import pandas as pd
 import numpy as np
-import joblib
-import json
-import matplotlib.pyplot as plt
-import seaborn as sns
-import shap
 import sqlite3
-import plotly.express as px  # İnteraktif grafikler için
 import sys
-import os
 
 # --- YOL YAPILANDIRMASI ---
 # Mevcut dizinin mutlak yolunu al (app.py'nin olduğu yer)
@@ -18,13 +16,19 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 if current_dir not in sys.path:
     sys.path.append(current_dir)
 
-from src.config import PROCESSED_DATA_DIR, MODEL_DIR
+from src.ui_common import (
+    logger, MODEL_VERSION, SIDEBAR_FOOTER_HTML, inject_css,
+    load_artifacts, get_explainer, explain, predict_churn, show_plot
+)
 
 # --- İZLEME MODÜLÜ İÇE AKTARMA ---
 # DB dosyası 'src/monitoring/db.py' yolunda olduğu için
 # Python'un src paketinden import ediyoruz.
 try:
-    from src.monitoring.db import init_db, log_prediction, get_connection
+    from src.monitoring.db import (
+        init_db, log_prediction, get_connection,
+        get_prediction_kpis, get_recent_predictions
+    )
 except ImportError as e:
     st.error(f"İzleme modülü yüklenirken hata oluştu: {e}")
     st.stop()
@@ -42,163 +46,53 @@ st.set_page_config(
 init_db()
 
 # --- YÜKSEK KONTRASTLI KOYU TEMA CSS ---
-st.markdown("""
-<style>
-    /* Genel Ayarlar (Ana Uygulama) */
-    .stApp {
-        background-color: #0e1117;
-        color: #ffffff;
-    }
-    
-    /* --- KENAR ÇUBUĞU DÜZELTMESİ --- */
-    [data-testid="stSidebar"] {
-        background-color: #161b22 !important;
-        border-right: 1px solid #30363d;
-    }
-    
-    /* Kenar Çubuğundaki tüm metinleri beyaz yap */
-    [data-testid="stSidebar"] * {
-        color: #e6edf3 !important;
-    }
-
-    /* --- RADYO BUTONU VE ONAY KUTUSU METİNLERİ --- */
-    .stRadio label span, .stRadio label p {
-        color: #ffffff !important;
-        font-size: 1rem;
-    }
-    .stRadio > label {
-        color: #ffffff !important;
-        font-weight: bold;
-        font-size: 1.1rem;
-    }
-    div[role="radiogroup"] {
-        color: #ffffff !important;
-    }
-
-    /* --- DİĞER ELEMANLAR --- */
-    .stSelectbox label {
-        color: #ffffff !important;
-        font-weight: bold;
-    }
-    .stSelectbox > div > div {
-        background-color: #21262d !important;
-        color: #ffffff !important;
-        border: 1px solid #58a6ff;
-    }
-    
-    /* Özel Bilgi Kutusu */
-    .info-box {
-        background-color: #1f2937;
-        border: 1px solid #58a6ff;
-        padding: 1.5rem;
-        border-radius: 5px;
-        margin-bottom: 2rem;
-    }
-    .info-box h4 {
-        color: #58a6ff !important;
-        margin-top: 0;
-    }
-    .info-box p {
-        color: #e5e7eb !important;
-        margin-bottom: 0;
-    }
-
-    /* Metrik Kartları */
-    div[data-testid="stMetric"] {
-        background-color: #21262d;
-        border: 1px solid #484f58;
-        padding: 15px;
-        border-radius: 10px;
-    }
-    div[data-testid="stMetric"] label {
-        color: #8b949e !important;
-    }
-    div[data-testid="stMetric"] div[data-testid="stMetricValue"] {
-        color: #ffffff !important;
-    }
-
-    /* Başlık Düzeltmesi */
-    header[data-testid="stHeader"] {
-        background-color: #0e1117 !important;
-    }
-    
-    /* Başlıklar */
-    h1, h2, h3 {
-        color: #58a6ff !important;
-    }
-    /* Genel Paragraf Metinleri */
-    p {
-        color: #e6edf3;
-    }
-</style>
-""", unsafe_allow_html=True)
+inject_css()
 
 # --- YARDIMCI FONKSİYONLAR ---
 @st.cache_resource
-def load_artifacts():
-    """Eğitilmiş modeli ve gerekli meta verileri yükler."""
-    # 1. Modeli Yükle
-    try:
-        model = joblib.load(MODEL_DIR / 'final_model_optimized.pkl')
-    except FileNotFoundError:
-        st.error("Model dosyası (final_model_optimized.pkl) models dizininde bulunamadı.")
-        st.stop()
-    
-    # 2. Özellik Adlarını Yükle
-    # Uygulama önce models/feature_names.json'a, sonra processed/model_features.json'a bakar
-    feature_names = []
-    feature_file_used = ""
-    
-    try:
-        path_primary = MODEL_DIR / 'feature_names.json'
-        path_secondary = PROCESSED_DATA_DIR / 'model_features.json'
-        
-        if path_primary.exists():
-            with open(path_primary, 'r') as f:
-                feature_names = json.load(f)
-            feature_file_used = "models/feature_names.json"
-        elif path_secondary.exists():
-            with open(path_secondary, 'r') as f:
-                feature_names = json.load(f)
-            feature_file_used = "data/processed/model_features.json"
-        else:
-            st.error("Özellik listesi JSON dosyası models/ veya data/processed/ dizininde bulunamadı.")
-            st.stop()
-            
-    except Exception as e:
-        st.error(f"Özellik adları yüklenirken hata: {e}")
-        st.stop()
-        
-    # 3. Veriyi Yükle
-    try:
-        data_path = PROCESSED_DATA_DIR / 'final_features_advanced.parquet'
-        data = pd.read_parquet(data_path)
-        
-        # Geç KeyErrors'ı önlemek için Sütunları hemen doğrula
-        missing_cols = [col for col in feature_names if col not in data.columns]
-        if missing_cols:
-            st.warning(f"Veri Uyuşmazlığı tespit edildi! '{feature_file_used}' içindeki özellik listesi, parke dosyasında bulunmayan sütunlar bekliyor: {missing_cols}")
-            # Güvenli mod: Sadece gerçekten var olan sütunları tut
-            feature_names = [col for col in feature_names if col in data.columns]
-        
-        cols_to_keep = ['user_id', 'is_churn'] + feature_names
-        # user_id ve is_churn'ün de var olduğundan emin ol
-        cols_to_keep = [c for c in cols_to_keep if c in data.columns]
-        
-        data = data[cols_to_keep]
-        
-    except FileNotFoundError:
-        st.warning("Parquet verisi bulunamadı. Uygulama sadece Model Modunda çalışacak (geçmiş veri yok).")
-        data = pd.DataFrame()
-    except Exception as e:
-        st.error(f"Veri yüklenirken hata: {e}")
-        data = pd.DataFrame()
-
-    return model, feature_names, data
+def get_db_connection():
+    """İzleme sayfası okumaları için süreç genelinde paylaşılan SQLite bağlantısı."""
+    return get_connection()
+
+@st.cache_data(ttl=30)
+def load_monitoring_data(limit: int = 5000):
+    """İzleme KPI'larını ve son tahmin kayıtlarını 30 saniyelik TTL ile önbelleğe alır."""
+    conn = get_db_connection()
+    return get_prediction_kpis(conn), get_recent_predictions(conn, limit=limit)
+
+@st.cache_data(ttl=30)
+def build_prob_histogram(probs: np.ndarray):
+    """Tahmin edilen olasılık histogramını oluşturur."""
+    import plotly.express as px
+    fig = px.histogram(
+        x=probs, 
+        nbins=20, 
+        title="Tahmin Edilen Olasılık Dağılımı",
+        labels={'x': 'predicted_prob'},
+        color_discrete_sequence=['#58a6ff'],
+        template="plotly_dark"
+    )
+    fig.update_layout(bargap=0.1)
+    return fig
+
+@st.cache_data(ttl=30)
+def build_velocity_box(velocities: np.ndarray, baseline_mean: float):
+    """Canlı satın alma hızı kutu grafiğini eğitim temeli çizgisiyle oluşturur."""
+    import plotly.express as px
+    fig = px.box(
+        y=velocities, 
+        title=f"Canlı Hız Dağ. (Temel: {baseline_mean:.2f})",
+        labels={'y': 'purchase_velocity'},
+        color_discrete_sequence=['#FF4B4B'],
+        template="plotly_dark"
+    )
+    # Temel referans çizgisi
+    fig.add_hline(y=baseline_mean, line_dash="dash", line_color="green", annotation_text="Eğitim Temeli")
+    return fig
 
 # --- VERİYİ YÜKLE ---
 try:
-    model, feature_names, df = load_artifacts()
+    model, feature_names, df, X = load_artifacts()
 except Exception as e:
     st.error(f"Sistem Hatası: {e}")
     st.stop()
@@ -218,15 +112,7 @@ page = st.sidebar.radio("NAVİGASYON", [
 st.sidebar.markdown("---")
 
 # --- KENAR ÇUBUĞU ALT BİLGİSİ ---
-st.sidebar.markdown("""
-### Geliştiren
-<div style="margin-top: -10px;">
-    <h4 style="margin-bottom: 0px; color: #ffffff;">Murat IYIGUN</h4>
-    <p style="margin-top: 0px; font-size: 0.9rem; color: #8b949e; font-style: italic;">
-        Veri Bilimci & Yapay Zeka Mühendisi
-    </p>
-</div>
-""", unsafe_allow_html=True)
+st.sidebar.markdown(SIDEBAR_FOOTER_HTML, unsafe_allow_html=True)
 
 # --- SAYFA 1: TAHMİN MERKEZİ ---
 if page == "🏠 Tahmin Merkezi":
@@ -256,7 +142,7 @@ if page == "🏠 Tahmin Merkezi":
         
         with sel_col2:
             if input_method == "ID Listesi":
-                selected_user_id = st.selectbox("Müşteri ID'si Ara:", df['user_id'].head(100).tolist())
+                selected_user_id = st.selectbox("Müşteri ID'si Ara:", df.index[:100].tolist())
             else:
                 if st.button("🎲 Rastgele Profil Oluştur", type="primary"):
                     selected_user_id = df['user_id'].sample(1).values[0]
@@ -264,21 +150,25 @@ if page == "🏠 Tahmin Merkezi":
                     selected_user_id = df['user_id'].iloc[0]
 
         # TAHMİN
-        customer_data = df[df['user_id'] == selected_user_id].iloc[0]
-        input_features = customer_data[feature_names].to_frame().T
-        churn_prob = model.predict(input_features)[0]
+        customer_data = df.loc[selected_user_id]
+        row_idx = df.index.get_loc(selected_user_id)
+        feature_row = X[row_idx:row_idx + 1]
+        churn_prob = predict_churn(int(selected_user_id), MODEL_VERSION, model, feature_row)
         THRESHOLD = 0.38 
         is_churn = churn_prob >= THRESHOLD
 
         # --- GÜNLÜK KAYDI (LOGGING) ---
-        # Tahmin yapılır yapılmaz veritabanına kaydet
+        # Her tahmin hemen yazılır: Streamlit oturumları bir kapanış kancası olmadan biter,
+        # oturumda tamponlanan kayıtlar kaybolur ve kayma izlemesi eksik veriyle çalışır
         log_prediction(
             user_id=int(selected_user_id),
             features=customer_data,
             prob=float(churn_prob),
             label=int(is_churn),
-            model_version='v1.0.3'
+            model_version=MODEL_VERSION
         )
+        # Yeni kayıt yazıldı; izleme önbelleği bayatladı
+        load_monitoring_data.clear()
         # ---------------
 
         st.markdown("---")
@@ -308,23 +198,32 @@ if page == "🏠 Tahmin Merkezi":
         with r3:
             st.markdown("### Yapay Zeka Gerekçesi (SHAP)")
             try:
-                explainer = shap.TreeExplainer(model)
-                shap_values = explainer(input_features)
+                # Plotly yalnızca grafik çizilirken yüklenir (soğuk başlangıcı hızlandırır)
+                import plotly.express as px
                 
-                plt.style.use('dark_background')
-                fig, ax = plt.subplots(figsize=(8, 4))
-                fig.patch.set_alpha(0.0)
-                ax.patch.set_alpha(0.0)
+                vals = explain(int(selected_user_id), MODEL_VERSION, get_explainer(model), feature_row)
                 
-                shap.plots.waterfall(shap_values[0], max_display=5, show=False)
+                # En büyük mutlak katkıya sahip 5 özellik (matplotlib yerine Plotly)
+                names = np.asarray(feature_names)
+                idx = np.argsort(np.abs(vals))[-5:]
                 
-                for text in ax.get_yticklabels() + ax.get_xticklabels():
-                    text.set_color('white')
-                    text.set_fontsize(10)
-                    
-                st.pyplot(fig, bbox_inches='tight')
-                plt.close(fig)
-            except Exception as e:
+                fig = px.bar(
+                    x=vals[idx],
+                    y=names[idx],
+                    orientation='h',
+                    color=np.where(vals[idx] > 0, "Riski Artırır", "Riski Azaltır"),
+                    color_discrete_map={"Riski Artırır": "#FF4B4B", "Riski Azaltır": "#58a6ff"},
+                    labels={'x': 'SHAP Değeri', 'y': '', 'color': ''},
+                    # color= çubukları iki izlemeye böler; büyüklük sırası açıkça sabitlenir
+                    # (liste yukarıdan aşağıya: en büyük katkı en üstte)
+                    category_orders={'y': names[idx][::-1].tolist()},
+                    template="plotly_dark"
+                )
+                fig.update_layout(height=300, margin=dict(l=0, r=0, t=10, b=0))
+                st.plotly_chart(fig, use_container_width=True)
+            except Exception:
+                # SHAP arka uçları (GPU/FastTreeSHAP/standart) farklı hata türleri fırlatabilir
+                logger.exception("SHAP açıklaması oluşturulamadı (user_id=%s)", selected_user_id)
                 st.warning("Açıklama mevcut değil.")
 
 # --- SAYFA 2: MODEL ANALİZİ ---
@@ -343,19 +242,14 @@ elif page == "📊 Model Analizi":
     c1, c2 = st.columns(2)
     with c1:
         st.markdown("#### 📉 ROC ve Precision-Recall Eğrileri")
-        try: st.image("plots/13_roc_pr_curves.png", use_container_width=True)
-        except: st.info("Görselleştirme mevcut değil.")
+        show_plot("13_roc_pr_curves.png")
             
     with c2:
         st.markdown("#### 🔑 Özellik Önemi")
-        try: st.image("plots/14_feature_importance.png", use_container_width=True)
-        except: st.info("Görselleştirme mevcut değil.")
+        show_plot("14_feature_importance.png")
 
     st.markdown("#### 💰 ROI Optimizasyon Analizi")
-    try:
-        st.image("plots/20_threshold_optimization.png", use_container_width=True)
-    except:
-        st.info("ROI Grafiği mevcut değil.")
+    show_plot("20_threshold_optimization.png", "ROI Grafiği mevcut değil.")
 
 # --- SAYFA 3: VERİ ANALİZİ ---
 elif page == "📈 Derinlemesine Analiz":
@@ -368,31 +262,26 @@ elif page == "📈 Derinlemesine Analiz":
         col1, col2 = st.columns(2)
         with col1:
             st.markdown("##### ⏰ Sipariş Zamanlama Alışkanlıkları")
-            try: st.image("plots/02_orders_univariate.png", use_container_width=True)
-            except: st.info("Veri mevcut değil.")
+            show_plot("02_orders_univariate.png", "Veri mevcut değil.")
         with col2:
             st.markdown("##### 📦 Ürün Yakınlığı")
-            try: st.image("plots/04_product_metrics.png", use_container_width=True)
-            except: st.info("Veri mevcut değil.")
+            show_plot("04_product_metrics.png", "Veri mevcut değil.")
                 
     with tab2:
         st.markdown("##### 🧠 Genel Açıklanabilirlik (SHAP)")
-        try:
-            st.image("plots/16_shap_summary.png", use_container_width=True)
+        if show_plot("16_shap_summary.png", "SHAP özeti mevcut değil."):
             st.info("Özellik Etki Yönü: Kırmızı = Yüksek Değer, Mavi = Düşük Değer.")
-        except: st.info("SHAP özeti mevcut değil.")
 
 # --- SAYFA 4: SİSTEM İZLEME (YENİ) ---
 elif page == "⚡ Sistem İzleme":
     st.title("⚡ Canlı Sistem İzleme")
     st.markdown("Model tahminlerinin ve veri kaymasının gerçek zamanlı takibi.")
 
-    # Veritabanından günlük kayıtlarını al
+    # KPI'lar SQLite içinde toplanır; grafikler için yalnızca son kayıtlar okunur
     try:
-        conn = get_connection()
-        logs_df = pd.read_sql("SELECT * FROM predictions ORDER BY timestamp DESC", conn)
-        conn.close()
-    except Exception as e:
+        kpis, logs_df = load_monitoring_data(limit=5000)
+    except (sqlite3.Error, pd.errors.DatabaseError) as e:
+        logger.exception("İzleme veritabanı okunamadı")
         st.error(f"Bağlantı Hatası: {e}")
         logs_df = pd.DataFrame()
 
@@ -403,15 +292,14 @@ elif page == "⚡ Sistem İzleme":
         st.subheader("📡 Canlı İstatistikler")
         k1, k2, k3, k4 = st.columns(4)
         
-        total_preds = len(logs_df)
-        churn_rate = logs_df['predicted_label'].mean() * 100
-        avg_conf = logs_df['predicted_prob'].mean() * 100
-        last_active = logs_df['timestamp'].iloc[0]
+        total_preds, churn_rate, avg_conf, last_active = kpis
+        churn_rate *= 100
+        avg_conf *= 100
 
         k1.metric("Toplam Tahmin", f"{total_preds}", "+1 (Canlı)")
         k2.metric("Ort. Tahmini Kayıp Oranı", f"{churn_rate:.1f}%", "Hedef < 20%")
         k3.metric("Ort. Güven", f"{avg_conf:.1f}%")
-        k4.metric("Son Aktivite", last_active.split('.')[0]) # Saniyeleri temizle
+        k4.metric("Son Aktivite", pd.Timestamp(last_active).strftime('%Y-%m-%d %H:%M:%S')) # Saniye altını temizle
 
         st.markdown("---")
         
@@ -420,15 +308,7 @@ elif page == "⚡ Sistem İzleme":
         
         with col1:
             st.markdown("#### 📊 Tahmin Dağılımı")
-            fig = px.histogram(
-                logs_df, 
-                x="predicted_prob", 
-                nbins=20, 
-                title="Tahmin Edilen Olasılık Dağılımı",
-                color_discrete_sequence=['#58a6ff'],
-                template="plotly_dark"
-            )
-            fig.update_layout(bargap=0.1)
+            fig = build_prob_histogram(logs_df['predicted_prob'].to_numpy())
             st.plotly_chart(fig, use_container_width=True)
             
         with col2:
@@ -436,17 +316,8 @@ elif page == "⚡ Sistem İzleme":
             # Temel (Eğitim Verisi) ile Canlı Veriyi Karşılaştır
             # Eğitim verisinden ortalama hızı al (genel df'den)
             baseline_mean = df['purchase_velocity'].mean()
-            current_mean = logs_df['purchase_velocity'].mean()
             
-            fig = px.box(
-                logs_df, 
-                y="purchase_velocity", 
-                title=f"Canlı Hız Dağ. (Temel: {baseline_mean:.2f})",
-                color_discrete_sequence=['#FF4B4B'],
-                template="plotly_dark"
-            )
-            # Temel referans çizgisi
-            fig.add_hline(y=baseline_mean, line_dash="dash", line_color="green", annotation_text="Eğitim Temeli")
+            fig = build_velocity_box(logs_df['purchase_velocity'].to_numpy(), float(baseline_mean))
             st.plotly_chart(fig, use_container_width=True)
 
         # HAM GÜNLÜK KAYITLARI
@@ -455,4 +326,4 @@ elif page == "⚡ Sistem İzleme":
 
 # --- ALT BİLGİ ---
 st.sidebar.markdown("---")
-st.sidebar.caption("v1.0.3 | Üretim Sürümü")
\ No newline at end of file
+st.sidebar.caption(f"{MODEL_VERSION} | Üretim Sürümü")
\ No newline at end of file
@@ -5,7 +5,10 @@ Tüm proje ayarları, yolları ve iş kuralları bu dosyada tanımlanmıştır.
 """
 
 from pathlib import Path
-from typing import Dict, List
+from types import MappingProxyType
+from typing import Mapping
+import functools
+import logging
 import os
 
 # ============================================================================
@@ -18,63 +21,74 @@ DATA_DIR = ROOT_DIR / "data"
 MODEL_DIR = ROOT_DIR / "models"
 LOG_DIR = ROOT_DIR / "logs"
 NOTEBOOK_DIR = ROOT_DIR / "notebooks"
+PLOT_DIR = ROOT_DIR / "plots"
 
 # Veri alt dizinleri
 RAW_DATA_DIR = DATA_DIR / "raw"
 PROCESSED_DATA_DIR = DATA_DIR / "processed"
 EXTERNAL_DATA_DIR = DATA_DIR / "external"
 
+@functools.lru_cache(maxsize=1)
+def _ensure_dirs():
+    """Proje dizinlerini (yoksa) tek seferde oluşturur; sonraki çağrılar önbellekten döner."""
+    for directory in [RAW_DATA_DIR, PROCESSED_DATA_DIR, EXTERNAL_DATA_DIR,
+                      MODEL_DIR, LOG_DIR, PLOT_DIR]:
+        # parents=True üst dizinleri (DATA_DIR) de oluşturur
+        directory.mkdir(parents=True, exist_ok=True)
+
 # Dizinler mevcut değilse oluştur
-for directory in [DATA_DIR, MODEL_DIR, LOG_DIR, RAW_DATA_DIR, 
-                  PROCESSED_DATA_DIR, EXTERNAL_DATA_DIR]:
-    directory.mkdir(parents=True, exist_ok=True)
+_ensure_dirs()
+
+# Üst düzey yapılandırma sözlükleri MappingProxyType ile salt okunurdur;
+# iç içe parametre sözlükleri (ör. ADVANCED_MODEL_PARAMS['lightgbm']) model
+# kütüphanelerine doğrudan verilebilmesi için düz dict olarak kalır.
 
 # ============================================================================
 # VERİ DOSYALARI
 # ============================================================================
 
 # Ham veri dosyaları (Instacart)
-RAW_DATA_FILES = {
+RAW_DATA_FILES = MappingProxyType({
     'orders': RAW_DATA_DIR / 'orders.csv',
     'order_products_prior': RAW_DATA_DIR / 'order_products__prior.csv',
     'order_products_train': RAW_DATA_DIR / 'order_products__train.csv',
     'products': RAW_DATA_DIR / 'products.csv',
     'aisles': RAW_DATA_DIR / 'aisles.csv',
     'departments': RAW_DATA_DIR / 'departments.csv'
-}
+})
 
 # İşlenmiş veri dosyaları
-PROCESSED_DATA_FILES = {
+PROCESSED_DATA_FILES = MappingProxyType({
     'train_features': PROCESSED_DATA_DIR / 'train_features.parquet',
     'test_features': PROCESSED_DATA_DIR / 'test_features.parquet',
     'customer_features': PROCESSED_DATA_DIR / 'customer_features.parquet',
     'train_labels': PROCESSED_DATA_DIR / 'train_labels.parquet',
     'test_labels': PROCESSED_DATA_DIR / 'test_labels.parquet'
-}
+})
 
 # ============================================================================
 # İŞ KURALLARI VE TANIMLARI
 # ============================================================================
 
 # Müşteri Kaybı (Churn) Tanımı
-CHURN_DEFINITION = {
+CHURN_DEFINITION = MappingProxyType({
     'days_threshold': 30,  # 30 günden fazla süredir sipariş vermeyen müşteriler kayıp olarak kabul edilir
     'min_orders': 3,       # Geçmişinde en az 3 siparişi olmalı
     'observation_window': 90,  # Son 90 günlük veri
     'prediction_horizon': 14   # Sonraki 14 gün için tahmin yap
-}
+})
 
 # İş Metrikleri
-BUSINESS_METRICS = {
+BUSINESS_METRICS = MappingProxyType({
     'avg_customer_value': 150,     # Ortalama müşteri değeri ($)
     'avg_order_value': 50,         # Ortalama sipariş değeri ($)
     'retention_cost': 10,          # Müşteriyi elde tutma kampanya maliyeti ($)
     'acquisition_cost': 45,        # Yeni müşteri kazanım maliyeti ($)
     'target_churn_rate': 0.18      # Hedef müşteri kaybı oranı
-}
+})
 
 # Özellik Grupları
-FEATURE_GROUPS = {
+FEATURE_GROUPS = MappingProxyType({
     'rfm_features': [
         'recency', 'frequency', 'monetary',
         'days_since_first_order', 'days_since_last_order',
@@ -94,7 +108,7 @@ FEATURE_GROUPS = {
         'order_count_trend', 'basket_value_trend',
         'order_regularity_score', 'seasonality_score'
     ]
-}
+})
 
 # ============================================================================
 # MODEL YAPILANDIRMASI
@@ -104,15 +118,15 @@ FEATURE_GROUPS = {
 RANDOM_STATE = 42
 
 # Eğitim-test ayrımı
-TRAIN_TEST_SPLIT = {
+TRAIN_TEST_SPLIT = MappingProxyType({
     'test_size': 0.2,
     'validation_size': 0.1,
     'stratify': True,
     'method': 'time_based'  # zaman_tabanlı veya rastgele
-}
+})
 
 # Model Parametreleri - Baseline
-BASELINE_PARAMS = {
+BASELINE_PARAMS = MappingProxyType({
     'logistic_regression': {
         'max_iter': 1000,
         'random_state': RANDOM_STATE,
@@ -125,10 +139,10 @@ BASELINE_PARAMS = {
         'class_weight': 'balanced',
         'n_jobs': -1
     }
-}
+})
 
 # Model Parametreleri - Gelişmiş
-ADVANCED_MODEL_PARAMS = {
+ADVANCED_MODEL_PARAMS = MappingProxyType({
     'lightgbm': {
         'objective': 'binary',
         'metric': 'auc',
@@ -139,6 +153,9 @@ ADVANCED_MODEL_PARAMS = {
         'bagging_fraction': 0.8,
         'bagging_freq': 5,
         'verbose': -1,
+        # Varsayılan iş parçacığı sayısı çekirdekleri aşırı yükleyebilir; bir çekirdek boşta bırakılır.
+        # OMP_NUM_THREADS ayarlıysa (ör. launch_optuna'nın işçilere verdiği pay) o değer kullanılır.
+        'num_threads': int(os.environ.get('OMP_NUM_THREADS') or max(1, (os.cpu_count() or 2) - 1)),
         'random_state': RANDOM_STATE
     },
     'xgboost': {
@@ -158,22 +175,34 @@ ADVANCED_MODEL_PARAMS = {
         'random_state': RANDOM_STATE,
         'verbose': False
     }
-}
+})
 
 # Hiperparametre Optimizasyonu (Optuna)
-OPTUNA_CONFIG = {
+OPTUNA_CONFIG = MappingProxyType({
     'n_trials': 100,
     'timeout': 3600,  # 1 saat
-    'n_jobs': -1,
-    'show_progress_bar': True
-}
+    # Denemeler iş parçacığıyla değil, ortak depolamayı paylaşan ayrı süreçlerle paralelleştirilir
+    # (bkz. src/models/tuning.py::launch_optuna)
+    'n_jobs': 1,
+    'show_progress_bar': True,
+    'storage': f"sqlite:///{LOG_DIR / 'optuna.db'}",
+    # Çalışma adı öneki; tam ad model/çalıştırmaya göre türetilir (bkz. tuning.make_study_name)
+    'study_prefix': 'freshcart',
+    'load_if_exists': True,
+    # Asenkron ardışık yarılama (ASHA): umut vermeyen denemeler erken budanır
+    'pruner': {
+        'cls': 'SuccessiveHalvingPruner',
+        'min_resource': 20,
+        'reduction_factor': 3
+    }
+})
 
 # Özellik Seçimi
-FEATURE_SELECTION = {
+FEATURE_SELECTION = MappingProxyType({
     'method': 'shap',  # shap, önem (importance), özyinelemeli (recursive)
     'n_features': 50,
     'threshold': 0.01
-}
+})
 
 # ============================================================================
 # DEĞERLENDİRME METRİKLERİ
@@ -192,109 +221,111 @@ EVALUATION_METRICS = [
 CLASSIFICATION_THRESHOLD = 0.5
 
 # İş metriği eşikleri
-PERFORMANCE_THRESHOLDS = {
+PERFORMANCE_THRESHOLDS = MappingProxyType({
     'min_precision': 0.80,  # Minimum hassasiyet (precision)
     'min_recall': 0.75,     # Minimum duyarlılık (recall)
     'min_f1': 0.77,         # Minimum F1 skoru
     'min_auc': 0.85         # Minimum AUC
-}
+})
 
 # ============================================================================
 # ÖN İŞLEME
 # ============================================================================
 
 # Eksik değer yönetimi
-MISSING_VALUE_STRATEGY = {
+MISSING_VALUE_STRATEGY = MappingProxyType({
     'numeric': 'median',  # ortalama (mean), medyan (median), mod (mode)
     'categorical': 'mode'
-}
+})
 
 # Aykırı değer tespiti
-OUTLIER_CONFIG = {
+OUTLIER_CONFIG = MappingProxyType({
     'method': 'iqr',  # iqr, zscore, isolation_forest
     'threshold': 3.0
-}
+})
 
 # Ölçeklendirme
-SCALING_CONFIG = {
+SCALING_CONFIG = MappingProxyType({
     'method': 'standard',  # standard, minmax, robust
     'columns': 'numeric'   # sayısal (numeric), tümü (all), özel (custom)
-}
+})
 
 # Kodlama (Encoding)
-ENCODING_CONFIG = {
-    'categorical_method': 'target',  # onehot, label, target, binary
+ENCODING_CONFIG = MappingProxyType({
+    # native_categorical: sütunlar 'category' tipine çevrilir ve LightGBM'e
+    # categorical_feature olarak verilir (kat başına hedef kodlama hesaplanmaz)
+    'categorical_method': 'native_categorical',  # native_categorical, onehot, label, target, binary
+    'cast_to_category': True,
     'high_cardinality_threshold': 10
-}
+})
 
 # ============================================================================
 # API VE DAĞITIM
 # ============================================================================
 
 # API Yapılandırması
-API_CONFIG = {
+API_CONFIG = MappingProxyType({
     'host': '0.0.0.0',
     'port': 8000,
     'reload': True,
     'log_level': 'info'
-}
+})
 
 # Model sunma
-MODEL_SERVING = {
+MODEL_SERVING = MappingProxyType({
     'model_path': MODEL_DIR / 'final_model.pkl',
     'preprocessor_path': MODEL_DIR / 'preprocessor.pkl',
     'batch_size': 1000,
     'timeout': 30
-}
+})
 
 # ============================================================================
 # İZLEME VE GÜNLÜK KAYDI
 # ============================================================================
 
 # Günlük kaydı (logging) yapılandırması
-LOGGING_CONFIG = {
+LOGGING_CONFIG = MappingProxyType({
     'level': 'INFO',
     'format': '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     'log_file': LOG_DIR / 'freshcart_churn.log'
-}
+})
 
 # İzleme metrikleri
-MONITORING_METRICS = {
+MONITORING_METRICS = MappingProxyType({
     'model_performance': ['precision', 'recall', 'f1', 'auc'],
     'business_metrics': ['churn_rate', 'retention_rate', 'campaign_roi'],
     'system_metrics': ['response_time', 'error_rate', 'throughput']
-}
+})
 
 # Veri kayması (data drift) tespiti
-DATA_DRIFT_CONFIG = {
+DATA_DRIFT_CONFIG = MappingProxyType({
     'enabled': True,
     'check_interval': 'daily',
     'threshold': 0.05
-}
+})
 
 # ============================================================================
 # GÖRSELLEŞTİRME
 # ============================================================================
 
-VISUALIZATION_CONFIG = {
+VISUALIZATION_CONFIG = MappingProxyType({
     'style': 'seaborn',
     'palette': 'Set2',
     'figsize': (12, 6),
     'dpi': 100,
     'save_format': 'png'
-}
+})
 
-# Çizim dizinleri
-PLOT_DIR = ROOT_DIR / "plots"
-PLOT_DIR.mkdir(exist_ok=True)
+# Çizim dizini (PLOT_DIR) proje yolları bölümünde tanımlanır ve oluşturulur.
 
 # ============================================================================
 # YARDIMCI FONKSİYONLAR
 # ============================================================================
 
-def get_config() -> Dict:
-    """Tüm yapılandırmayı bir sözlük olarak döndürür"""
-    return {
+@functools.lru_cache(maxsize=1)
+def get_config() -> Mapping:
+    """Tüm yapılandırmayı salt okunur bir eşleme olarak döndürür (ilk çağrıdan sonra önbellekten)"""
+    return MappingProxyType({
         'paths': {
             'root': ROOT_DIR,
             'data': DATA_DIR,
@@ -305,7 +336,23 @@ def get_config() -> Dict:
         'churn_definition': CHURN_DEFINITION,
         'model': ADVANCED_MODEL_PARAMS,
         'evaluation': EVALUATION_METRICS
-    }
+    })
+
+def configure_logging():
+    """
+    Kök günlükleyiciyi LOGGING_CONFIG'e göre (konsol + dosya) yapılandırır.
+    
+    Modüller içe aktarılırken çağrılmamalı; yalnızca betiklerin giriş noktalarından
+    (__main__) bir kez çağrılır. İşçi süreçleri kök günlükleyiciyi bu şekilde devralır.
+    """
+    logging.basicConfig(
+        level=LOGGING_CONFIG['level'],
+        format=LOGGING_CONFIG['format'],
+        handlers=[
+            logging.StreamHandler(),
+            logging.FileHandler(LOGGING_CONFIG['log_file'], encoding='utf-8')
+        ]
+    )
 
 def print_config():
     """Yapılandırmanın bir özetini yazdırır"""
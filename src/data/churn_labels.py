@@ -7,13 +7,42 @@ Gerçek müşteri kaybı etiketlerini tanımlamak için 'train' değerlendirme s
 
 import pandas as pd
 import numpy as np
-from typing import Tuple, Dict
+from typing import Tuple, Dict, Optional
 import logging
 
-logging.basicConfig(level=logging.INFO)
+# Numba isteğe bağlıdır; yoksa etiketler NumPy ile hesaplanır
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
 logger = logging.getLogger(__name__)
 
 
+if njit is not None:
+    # cache=True kullanılmıyor: modül hem 'src.data.churn_labels' hem de (notebook'larda)
+    # 'data.churn_labels' olarak içe aktarılıyor ve Numba'nın disk önbelleği modül adını
+    # sakladığı için diğer yoldan yüklemede ModuleNotFoundError veriyor.
+    @njit
+    def _label_churn(days, thresh, out):
+        """
+        NaN günleri 0 ile doldurur, eşik karşılaştırmasını yerinde yazar ve kayıp sayısını
+        döndürür (istatistikler için ikinci bir geçiş gerekmez).
+        """
+        churn_cnt = 0
+        for i in range(days.shape[0]):
+            d = days[i]
+            if d != d:  # NaN kontrolü (fastmath bu kontrolü bozacağı için kapalı)
+                d = 0.0
+                days[i] = d
+            if d >= thresh:
+                out[i] = 1
+                churn_cnt += 1
+            else:
+                out[i] = 0
+        return churn_cnt
+
+
 class ChurnLabelCreator:
     """
     Instacart tarafından sağlanan 'train' değerlendirme setine dayanarak müşteri kaybı etiketleri oluşturur.
@@ -33,8 +62,8 @@ class ChurnLabelCreator:
                                   Not: Instacart verileri bu değeri 30 ile sınırlar, bu nedenle 30, '30+ gün' anlamına gelir.
         """
         self.churn_threshold = churn_threshold_days
-        logger.info(f"Müşteri Kaybı Tanımlama Stratejisi: Sonraki Sipariş Tahmini")
-        logger.info(f"Eşik Değer: days_since_prior_order >= {self.churn_threshold}")
+        logger.info("Müşteri Kaybı Tanımlama Stratejisi: Sonraki Sipariş Tahmini")
+        logger.info("Eşik Değer: days_since_prior_order >= %s", self.churn_threshold)
 
     def create_churn_labels(self, orders_df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -50,41 +79,75 @@ class ChurnLabelCreator:
         
         # 1. Yalnızca 'train' seti satırlarını filtrele. Bunlar bizim hedeflerimiz.
         # Not: 'test' seti satırlarının etiketi yoktur (Kaggle gönderimi için), bu yüzden burada onları yok sayıyoruz.
-        train_targets = orders_df[orders_df['eval_set'] == 'train'].copy()
+        # Maske bir kez hesaplanır ve yalnızca gereken iki sütun NumPy dizisi olarak alınır
+        # (ara veri çerçevesi, kopya ve yeniden adlandırma yok).
+        mask = self._train_mask(orders_df['eval_set'])
         
-        if train_targets.empty:
+        if not mask.any():
             logger.error("orders_df içinde 'train' satırı bulunamadı! Verilerin doğru yüklendiğinden emin olun.")
             raise ValueError("'train' değerlendirme seti bulunamadı.")
 
         # 2. Hedef Değişkeni Tanımla
         # NaN değerlerini işle (ilk siparişler train setinde olmamalı, ama güvenlik için iyidir)
-        train_targets['days_since_prior_order'] = train_targets['days_since_prior_order'].fillna(0)
-        
         # Etiket oluştur: kayıp ise 1 (>= 30 gün), aktif ise 0 (< 30 gün)
-        train_targets['is_churn'] = (
-            train_targets['days_since_prior_order'] >= self.churn_threshold
-        ).astype(int)
+        # 0/1 etiketi int8 olarak tutulur (int64'e göre 8 kat daha az bellek ve disk)
+        # Maskeli indeksleme yeni dizi döndürür; çekirdeğin yerinde yazması orders_df'i etkilemez
+        users = orders_df['user_id'].to_numpy()[mask].astype(np.int32, copy=False)
+        days = orders_df['days_since_prior_order'].to_numpy()[mask].astype(np.float32, copy=False)
+        if njit is not None:
+            is_churn = np.empty(days.shape[0], dtype=np.int8)
+            churn_cnt = _label_churn(days, np.float32(self.churn_threshold), is_churn)
+        else:
+            np.nan_to_num(days, copy=False, nan=0.0)
+            is_churn = (days >= self.churn_threshold).astype(np.int8)
+            churn_cnt = None
         
-        # 3. İlgili sütunları tut
-        # Analiz için 'days_since_prior_order' sütununu 'days_to_next_order' olarak saklıyoruz
-        labels_df = train_targets[['user_id', 'is_churn', 'days_since_prior_order']].rename(
-            columns={'days_since_prior_order': 'days_to_next_order'}
-        )
+        # 3. Etiket çerçevesini doğrudan oluştur
+        # Analiz için 'days_since_prior_order' değerini 'days_to_next_order' olarak saklıyoruz
+        labels_df = pd.DataFrame({
+            'user_id': users,
+            'is_churn': is_churn,
+            'days_to_next_order': days
+        })
         
         # 4. İstatistikler
-        self._print_stats(labels_df)
+        self._print_stats(is_churn, churn_cnt)
         
         return labels_df
 
-    def _print_stats(self, labels_df: pd.DataFrame):
-        """Etiket dağılım istatistiklerini yazdırmak için yardımcı fonksiyon."""
-        total_users = len(labels_df)
-        churn_cnt = labels_df['is_churn'].sum()
+    @staticmethod
+    def _train_mask(eval_set: pd.Series) -> np.ndarray:
+        """
+        eval_set == 'train' maskesini döndürür.
+        
+        Kategorik sütunlarda (veri yükleyicinin varsayılanı) karşılaştırma doğrudan int8
+        kodlar üzerinde yapılır; nesne (object) tipinde dize karşılaştırmasına düşülür.
+        """
+        if isinstance(eval_set.dtype, pd.CategoricalDtype):
+            categories = eval_set.cat.categories
+            if 'train' not in categories:
+                return np.zeros(len(eval_set), dtype=np.bool_)
+            return eval_set.cat.codes.to_numpy() == categories.get_loc('train')
+        return (eval_set == 'train').to_numpy()
+
+    def _print_stats(self, is_churn: np.ndarray, churn_cnt: Optional[int] = None):
+        """
+        Etiket dağılım istatistiklerini doğrudan 0/1 etiket dizisinden yazdırır.
+        
+        churn_cnt çekirdekten geliyorsa dizi yeniden sayılmaz.
+        """
+        # INFO kapalıysa istatistikler ve biçimlendirilmiş satırlar hiç hesaplanmaz
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        
+        total_users = is_churn.size
+        if churn_cnt is None:
+            churn_cnt = int(np.count_nonzero(is_churn))
         active_cnt = total_users - churn_cnt
         churn_rate = churn_cnt / total_users
         
         logger.info(f"\n{'='*80}")
-        logger.info(f"MÜŞTERİ KAYBI ETİKET İSTATİSTİKLERİ (Gerçek Değerler)")
+        logger.info("MÜŞTERİ KAYBI ETİKET İSTATİSTİKLERİ (Gerçek Değerler)")
         logger.info(f"{'='*80}")
         logger.info(f"Toplam Hedef Kullanıcı:      {total_users:>10,}")
         logger.info(f"Kaybedilen (>=30 gün):     {churn_cnt:>10,} ({churn_rate:.2%})")
@@ -94,24 +157,48 @@ class ChurnLabelCreator:
     def split_train_test_stratified(self, 
                                     master_df: pd.DataFrame, 
                                     test_size: float = 0.2,
-                                    random_state: int = 42):
+                                    random_state: int = 42,
+                                    return_indices: bool = False):
         """
         Nihai veri setinde katmanlı train-test ayrımı gerçekleştirir.
         Etiketler için veri setinin kendi 'train' ayrımına güvendiğimizden,
         modelimizi doğrulamak için burada kullanıcıları rastgele ayırıyoruz.
+        
+        Ayrım train_test_split(stratify=y) ile aynı satırları seçer; ancak özellik matrisi
+        önce kopyalanıp sonra bölünmez, her parça master_df'ten tek seferde alınır.
+        
+        Args:
+            return_indices: True ise (train_idx, test_idx) konum dizileri döndürülür; çağıran
+                            yalnızca ihtiyaç duyduğu sütunları dilimleyebilir.
+        
+        Returns:
+            (X_train, X_test, y_train, y_test) veya return_indices=True ise (train_idx, test_idx).
         """
-        from sklearn.model_selection import train_test_split
+        from sklearn.model_selection import StratifiedShuffleSplit
         
-        logger.info(f"Veri ayrılıyor (Test boyutu: {test_size}, Katmanlı)...")
+        logger.info("Veri ayrılıyor (Test boyutu: %s, Katmanlı)...", test_size)
         
-        X = master_df.drop(['user_id', 'is_churn', 'eval_set', 'days_to_next_order'], axis=1, errors='ignore')
         y = master_df['is_churn']
+        splitter = StratifiedShuffleSplit(n_splits=1, test_size=test_size, random_state=random_state)
+        train_idx, test_idx = next(splitter.split(np.zeros(len(y)), y))
+        if return_indices:
+            return train_idx, test_idx
         
-        return train_test_split(X, y, test_size=test_size, random_state=random_state, stratify=y)
+        excluded = {'user_id', 'is_churn', 'eval_set', 'days_to_next_order'}
+        feature_pos = [i for i, col in enumerate(master_df.columns) if col not in excluded]
+        
+        return (master_df.iloc[train_idx, feature_pos], master_df.iloc[test_idx, feature_pos],
+                y.iloc[train_idx], y.iloc[test_idx])
 
 
 # Mantığı test etmek için örnek kullanım
 if __name__ == "__main__":
+    import os
+    import sys
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+    from src.config import configure_logging
+    configure_logging()
+    
     # Test mantığı için sahte veri oluşturma
     # Gerçek kullanımda, gerçek verileri yükleyin
     print("ChurnLabelCreator mantığı test ediliyor...")
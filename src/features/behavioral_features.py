@@ -6,13 +6,107 @@ Müşteri davranış kalıplarını yakalayan özellikler.
 
 import pandas as pd
 import numpy as np
-from typing import List
+from typing import List, Optional, Tuple
 import logging
+from pathlib import Path
+
+# Numba isteğe bağlıdır; yoksa zaman istatistikleri pandas groupby ile hesaplanır
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+# Polars isteğe bağlıdır; yalnızca create_all_behavioral_features(backend='polars') için gerekir
+try:
+    import polars as pl
+except ImportError:
+    pl = None
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+if njit is not None:
+    # cache=True kullanılmıyor (bkz. churn_labels._label_churn: modül iki farklı adla içe aktarılıyor)
+    @njit(parallel=True)
+    def _segment_time_stats(bounds, hour, dow, n_hour, n_dow, means, stds, modes):
+        """
+        user_id'ye göre sıralı siparişlerde her kullanıcı dilimi [bounds[s], bounds[s+1]) için
+        saat ve gün sütunlarının ortalama, std (ddof=1) ve modunu tek çekirdekte hesaplar.
+        Mod, eşitlikte en küçük değeri seçer (Series.mode()[0] ile aynı).
+        """
+        for s in prange(bounds.shape[0] - 1):
+            lo = bounds[s]
+            hi = bounds[s + 1]
+            n = hi - lo
+            hour_counts = np.zeros(n_hour, np.int64)
+            dow_counts = np.zeros(n_dow, np.int64)
+            hour_sum = 0.0
+            dow_sum = 0.0
+            for i in range(lo, hi):
+                hour_sum += hour[i]
+                dow_sum += dow[i]
+                hour_counts[hour[i]] += 1
+                dow_counts[dow[i]] += 1
+            hour_mean = hour_sum / n
+            dow_mean = dow_sum / n
+            
+            hour_ss = 0.0
+            dow_ss = 0.0
+            for i in range(lo, hi):
+                hour_ss += (hour[i] - hour_mean) ** 2
+                dow_ss += (dow[i] - dow_mean) ** 2
+            
+            means[s, 0] = hour_mean
+            means[s, 1] = dow_mean
+            if n > 1:
+                stds[s, 0] = np.sqrt(hour_ss / (n - 1))
+                stds[s, 1] = np.sqrt(dow_ss / (n - 1))
+            else:
+                stds[s, 0] = np.nan
+                stds[s, 1] = np.nan
+            modes[s, 0] = np.argmax(hour_counts)
+            modes[s, 1] = np.argmax(dow_counts)
+
+    @njit
+    def _segment_exploration(bounds, order_number, product, n_products, rates):
+        """
+        user_id'ye göre sıralı satırlarda her kullanıcı dilimi için keşif oranını hesaplar:
+        medyan order_number'dan sonra görülen ürünlerden hiç erken görülmemiş olanların payı.
+        
+        Ürün bayrakları ürün kimliğiyle indekslenen tek bir dizide tutulur (hash kümesi yok);
+        stamp dizisi bayrakların hangi dilime ait olduğunu gösterdiğinden dilimler arasında
+        sıfırlama gerekmez. Paylaşılan diziler nedeniyle döngü paralel değildir.
+        """
+        stamp = np.zeros(n_products, np.int64)
+        flags = np.zeros(n_products, np.uint8)
+        for s in range(bounds.shape[0] - 1):
+            lo = bounds[s]
+            hi = bounds[s + 1]
+            median = np.median(order_number[lo:hi])
+            
+            # bit 1: erken görüldü, bit 2: geç görüldü
+            for i in range(lo, hi):
+                p = product[i]
+                if stamp[p] != s + 1:
+                    stamp[p] = s + 1
+                    flags[p] = 0
+                flags[p] |= 2 if order_number[i] > median else 1
+            
+            # Her ürün bir kez sayılır (sayılan ürünün damgası işaretlenir)
+            late_only = 0
+            late_total = 0
+            for i in range(lo, hi):
+                p = product[i]
+                if stamp[p] == s + 1:
+                    stamp[p] = -(s + 1)
+                    if flags[p] & 2:
+                        late_total += 1
+                        if flags[p] == 2:
+                            late_only += 1
+            rates[s] = late_only / late_total if late_total > 0 else 0.0
+
+
 class BehavioralFeatureEngineer:
     """
     Müşteri davranışsal özelliklerini oluşturur.
@@ -30,7 +124,10 @@ class BehavioralFeatureEngineer:
     def create_all_behavioral_features(self,
                                        orders_df: pd.DataFrame,
                                        order_products_df: pd.DataFrame,
-                                       products_df: pd.DataFrame) -> pd.DataFrame:
+                                       products_df: pd.DataFrame,
+                                       float32: bool = False,
+                                       backend: str = 'pandas',
+                                       n_shards: int = 1) -> pd.DataFrame:
         """
         Tüm davranışsal özellikleri oluşturur.
         
@@ -38,30 +135,74 @@ class BehavioralFeatureEngineer:
             orders_df: Siparişler veri çerçevesi.
             order_products_df: Sipariş ürünleri veri çerçevesi.
             products_df: Ürünler veri çerçevesi.
+            float32: True ise float64 özellik sütunları float32'ye dönüştürülür (yarı bellek).
+                     Varsayılan kapalıdır: float64 özelliklerle eğitilmiş bir model, float32
+                     girdide bölme eşiklerine çok yakın değerleri farklı yönlendirebilir.
+            backend: 'pandas' (varsayılan) veya 'polars'. Polars, order_products üzerindeki
+                     tekrar sipariş ve çeşitlilik özelliklerini tek bir tembel sorguda (ortak
+                     birleştirme bir kez hesaplanır) çok iş parçacıklı olarak üretir; zaman
+                     özellikleri yalnızca siparişler tablosunu okuduğundan her iki yolda da
+                     create_time_features ile hesaplanır. Sonuç pandas yoluyla aynıdır.
+            n_shards: pandas yolunda tekrar sipariş ve çeşitlilik özellikleri user_id % n_shards
+                      dilimlerinde sırayla hesaplanır (varsayılan 1: dilimleme yok). Tüm
+                      özellikler kullanıcı başına olduğundan sonuç değişmez; birleştirilmiş ara
+                      tabloların tepe belleği yaklaşık 1/n_shards'a iner.
             
         Returns:
             Kullanıcı düzeyinde davranışsal özelliklere sahip bir veri çerçevesi.
         """
+        if backend not in ('pandas', 'polars'):
+            raise ValueError(f"Desteklenmeyen backend: {backend}")
+        if n_shards < 1:
+            raise ValueError(f"n_shards en az 1 olmalı: {n_shards}")
+        
         logger.info("Davranışsal özellikler oluşturuluyor...")
         
         # Zaman bazlı özellikler
         time_features = self.create_time_features(orders_df)
         
-        # Tekrar sipariş özellikleri
-        reorder_features = self.create_reorder_features(orders_df, order_products_df)
-        
-        # Ürün çeşitliliği özellikleri
-        diversity_features = self.create_diversity_features(
-            orders_df, order_products_df, products_df
-        )
-        
-        # Hepsini birleştir
-        behavioral_features = time_features\
-            .merge(reorder_features, on='user_id', how='outer')\
-            .merge(diversity_features, on='user_id', how='outer')
-        
-        # NaN değerlerini doldur
-        behavioral_features = behavioral_features.fillna(0)
+        if backend == 'polars':
+            reorder_features, diversity_features = self._reorder_diversity_polars(
+                orders_df, order_products_df, products_df
+            )
+        else:
+            reorder_parts, diversity_parts = [], []
+            for shard_orders, shard_order_products in self._user_shards(
+                    orders_df, order_products_df, n_shards):
+                # order_products'a kullanıcı bilgisi bir kez eklenir ve iki özellik grubunda paylaşılır
+                order_products_with_user = self._attach_user(shard_orders, shard_order_products)
+                
+                # Tekrar sipariş özellikleri
+                reorder_parts.append(self.create_reorder_features(
+                    shard_orders, shard_order_products, order_products_with_user
+                ))
+                
+                # Ürün çeşitliliği özellikleri
+                diversity_parts.append(self.create_diversity_features(
+                    shard_orders, shard_order_products, products_df, order_products_with_user
+                ))
+                del order_products_with_user
+            reorder_features = pd.concat(reorder_parts, ignore_index=True)
+            diversity_features = pd.concat(diversity_parts, ignore_index=True)
+        
+        # Hepsini birleştir: user_id indeksinde hizalama (dış birleştirme) hash-join gerektirmez
+        parts = [part.set_index('user_id') for part in (time_features, reorder_features, diversity_features)]
+        behavioral_features = pd.concat(parts, axis=1).sort_index()
+        
+        # NaN değerlerini doldur. NaN yalnızca tek siparişli kullanıcıların std sütunlarında ve
+        # bir parçada bulunmayan kullanıcılarda (dış birleştirme) oluşur; tüm çerçeve yerine
+        # yalnızca bu sütunlar doldurulur.
+        nullable = ['std_order_hour', 'std_order_dow']
+        for part in parts:
+            if len(part) != len(behavioral_features):
+                nullable.extend(part.columns)
+        for col in dict.fromkeys(nullable):
+            behavioral_features[col] = behavioral_features[col].fillna(0)
+        behavioral_features = behavioral_features.reset_index()
+        
+        if float32:
+            float_cols = behavioral_features.select_dtypes('float64').columns
+            behavioral_features[float_cols] = behavioral_features[float_cols].astype(np.float32)
         
         self.feature_names = [col for col in behavioral_features.columns if col != 'user_id']
         
@@ -85,57 +226,131 @@ class BehavioralFeatureEngineer:
         logger.info("Zaman bazlı özellikler oluşturuluyor...")
         
         # Temel istatistikler
-        time_stats = orders_df.groupby('user_id').agg({
-            'order_hour_of_day': ['mean', 'std', lambda x: x.mode()[0] if len(x.mode()) > 0 else 0],
-            'order_dow': ['mean', 'std', lambda x: x.mode()[0] if len(x.mode()) > 0 else 0]
-        }).reset_index()
-        
-        time_stats.columns = [
-            'user_id',
-            'avg_order_hour',
-            'std_order_hour',
-            'preferred_hour',
-            'avg_order_dow',
-            'std_order_dow',
-            'preferred_dow'
-        ]
-        
-        # Hafta sonu siparişleri (dow 5, 6 = Cumartesi, Pazar)
-        weekend_orders = orders_df.groupby('user_id').apply(
-            lambda x: (x['order_dow'] >= 5).sum() / len(x)
-        ).reset_index()
-        weekend_orders.columns = ['user_id', 'weekend_order_ratio']
-        
-        # Gece siparişleri (20-06 saatleri)
-        night_orders = orders_df.groupby('user_id').apply(
-            lambda x: ((x['order_hour_of_day'] >= 20) | (x['order_hour_of_day'] < 6)).sum() / len(x)
-        ).reset_index()
-        night_orders.columns = ['user_id', 'night_order_ratio']
-        
-        # Sabah siparişleri (06-12 saatleri)
-        morning_orders = orders_df.groupby('user_id').apply(
-            lambda x: ((x['order_hour_of_day'] >= 6) & (x['order_hour_of_day'] < 12)).sum() / len(x)
-        ).reset_index()
-        morning_orders.columns = ['user_id', 'morning_order_ratio']
-        
-        # Öğleden sonra siparişleri (12-18 saatleri)
-        afternoon_orders = orders_df.groupby('user_id').apply(
-            lambda x: ((x['order_hour_of_day'] >= 12) & (x['order_hour_of_day'] < 18)).sum() / len(x)
-        ).reset_index()
-        afternoon_orders.columns = ['user_id', 'afternoon_order_ratio']
-        
-        # Tüm zaman özelliklerini birleştir
-        time_features = time_stats\
-            .merge(weekend_orders, on='user_id')\
-            .merge(night_orders, on='user_id')\
-            .merge(morning_orders, on='user_id')\
-            .merge(afternoon_orders, on='user_id')
+        if njit is not None:
+            time_stats = self._time_stats_numba(orders_df)
+        else:
+            time_stats = orders_df.groupby('user_id').agg(
+                avg_order_hour=('order_hour_of_day', 'mean'),
+                std_order_hour=('order_hour_of_day', 'std'),
+                avg_order_dow=('order_dow', 'mean'),
+                std_order_dow=('order_dow', 'std')
+            ).reset_index()
+            
+            # Mod: saat (0-23) ve gün (0-6) küçük tamsayılar olduğundan kullanıcı x değer sayım
+            # matrisinin satır argmax'ı alınır (eşitlikte en küçük değer, mode()[0] gibi)
+            user_codes, _ = pd.factorize(orders_df['user_id'], sort=True)
+            time_stats.insert(3, 'preferred_hour',
+                              self._bincount_mode(user_codes, orders_df['order_hour_of_day'].to_numpy(),
+                                                  len(time_stats)))
+            time_stats['preferred_dow'] = self._bincount_mode(
+                user_codes, orders_df['order_dow'].to_numpy(), len(time_stats))
+        
+        # Zaman dilimi oranları: her sipariş için boolean bayraklar bir kez hesaplanır ve
+        # kullanıcı başına ortalamaları tek bir groupby ile alınır (oran = bayrak ortalaması)
+        hour = orders_df['order_hour_of_day'].to_numpy()
+        dow = orders_df['order_dow'].to_numpy()
+        time_flags = pd.DataFrame({
+            'user_id': orders_df['user_id'].to_numpy(),
+            # Hafta sonu siparişleri (dow 5, 6 = Cumartesi, Pazar)
+            'weekend_order_ratio': dow >= 5,
+            # Gece siparişleri (20-06 saatleri)
+            'night_order_ratio': (hour >= 20) | (hour < 6),
+            # Sabah siparişleri (06-12 saatleri)
+            'morning_order_ratio': (hour >= 6) & (hour < 12),
+            # Öğleden sonra siparişleri (12-18 saatleri)
+            'afternoon_order_ratio': (hour >= 12) & (hour < 18)
+        })
+        # Sıra, time_stats ile birleştirmede indekse göre hizalandığından önemsizdir (sort=False)
+        time_ratios = time_flags.groupby('user_id', sort=False).mean()
+        
+        # Tüm zaman özelliklerini birleştir (her iki parça da user_id'ye göre gruplanmış)
+        time_features = pd.concat([time_stats.set_index('user_id'), time_ratios], axis=1).reset_index()
         
         return time_features
     
+    @staticmethod
+    def _bincount_mode(group_codes: np.ndarray, values: np.ndarray, n_groups: int) -> np.ndarray:
+        """
+        Negatif olmayan küçük tamsayı değerlerin grup başına modunu tek bincount ile bulur.
+        Sonuç int64'tür (yükleyicinin int8 saat/gün sütunları özelliklere taşınmaz).
+        """
+        n_values = int(values.max(initial=0)) + 1
+        counts = np.bincount(group_codes * n_values + values.astype(np.int64),
+                             minlength=n_groups * n_values).reshape(n_groups, n_values)
+        return counts.argmax(axis=1).astype(np.int64)
+    
+    @staticmethod
+    def _time_stats_numba(orders_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        create_time_features'taki temel istatistiklerin Numba karşılığı: siparişler
+        user_id'ye göre (gerekirse) bir kez sıralanır ve tüm kullanıcılar paralel olarak
+        tek geçişte işlenir. Çıktı groupby('user_id').agg ile aynı sütun ve sıradadır.
+        """
+        users = orders_df['user_id'].to_numpy()
+        hour = orders_df['order_hour_of_day'].to_numpy()
+        dow = orders_df['order_dow'].to_numpy()
+        # Instacart orders.csv zaten user_id'ye göre sıralıdır; değilse kararlı sıralama yapılır
+        if users.size and not (users[1:] >= users[:-1]).all():
+            order = np.argsort(users, kind='stable')
+            users, hour, dow = users[order], hour[order], dow[order]
+        
+        bounds = np.flatnonzero(np.r_[True, users[1:] != users[:-1], True]) if users.size \
+            else np.zeros(1, dtype=np.intp)
+        n_users = bounds.size - 1
+        means = np.empty((n_users, 2))
+        stds = np.empty((n_users, 2))
+        modes = np.empty((n_users, 2), dtype=np.int64)
+        _segment_time_stats(bounds, hour, dow, int(hour.max(initial=0)) + 1,
+                            int(dow.max(initial=0)) + 1, means, stds, modes)
+        
+        return pd.DataFrame({
+            'user_id': users[bounds[:-1]],
+            'avg_order_hour': means[:, 0],
+            'std_order_hour': stds[:, 0],
+            'preferred_hour': modes[:, 0],
+            'avg_order_dow': means[:, 1],
+            'std_order_dow': stds[:, 1],
+            'preferred_dow': modes[:, 1]
+        })
+    
+    @staticmethod
+    def _user_shards(orders_df: pd.DataFrame, order_products_df: pd.DataFrame, n_shards: int):
+        """
+        Siparişleri ve sipariş ürünlerini user_id % n_shards dilimlerine ayırır; her dilim
+        (orders, order_products) çifti olarak sırayla üretilir. Bir kullanıcının tüm satırları
+        aynı dilimdedir. Sipariş tablosunda bulunmayan order_products satırları (iç
+        birleştirmede zaten düşerler) hiçbir dilime alınmaz. n_shards=1 ise kopya yapılmaz.
+        """
+        if n_shards == 1:
+            yield orders_df, order_products_df
+            return
+        
+        order_shard = orders_df['user_id'].to_numpy() % n_shards
+        order_ids = orders_df['order_id'].to_numpy()
+        line_order_ids = order_products_df['order_id'].to_numpy()
+        # order_id'den dilime konum tablosu (-1: sipariş tablosunda yok)
+        shard_of_order = np.full(max(int(order_ids.max(initial=0)), int(line_order_ids.max(initial=0))) + 1,
+                                 -1, dtype=np.int32)
+        shard_of_order[order_ids] = order_shard
+        line_shard = shard_of_order[line_order_ids]
+        del shard_of_order
+        
+        for shard in range(n_shards):
+            yield (orders_df.take(np.flatnonzero(order_shard == shard)),
+                   order_products_df.take(np.flatnonzero(line_shard == shard)))
+    
+    @staticmethod
+    def _attach_user(orders_df: pd.DataFrame, order_products_df: pd.DataFrame) -> pd.DataFrame:
+        """order_products satırlarına siparişin user_id ve order_number değerlerini ekler."""
+        return order_products_df.merge(
+            orders_df[['order_id', 'user_id', 'order_number']],
+            on='order_id'
+        )
+    
     def create_reorder_features(self,
                                orders_df: pd.DataFrame,
-                               order_products_df: pd.DataFrame) -> pd.DataFrame:
+                               order_products_df: pd.DataFrame,
+                               order_products_with_user: Optional[pd.DataFrame] = None) -> pd.DataFrame:
         """
         Tekrar sipariş davranışı özellikleri.
         
@@ -144,55 +359,83 @@ class BehavioralFeatureEngineer:
         - avg_reorder_rate_per_order: Sipariş başına ortalama tekrar sipariş oranı.
         - reorder_consistency: Tekrar sipariş verme tutarlılığı.
         - favorite_products_count: Favori ürünlerin sayısı (5+ kez sipariş edilenler).
+        
+        order_products_with_user verilirse (_attach_user çıktısı) birleştirme tekrarlanmaz.
         """
         logger.info("Tekrar sipariş davranışı özellikleri oluşturuluyor...")
         
         # user_id'yi almak için birleştir
-        order_products_with_user = order_products_df.merge(
-            orders_df[['order_id', 'user_id']], 
-            on='order_id'
+        if order_products_with_user is None:
+            order_products_with_user = self._attach_user(orders_df, order_products_df)
+        
+        # Kullanıcı başına genel tekrar sipariş oranı (adlandırılmış toplamalar düz sütun üretir)
+        reorder_stats = order_products_with_user.groupby('user_id').agg(
+            overall_reorder_rate=('reordered', 'mean'),
+            total_reordered_items=('reordered', 'sum'),
+            reorder_rate_std=('reordered', 'std')
         )
-        
-        # Kullanıcı başına genel tekrar sipariş oranı
-        reorder_stats = order_products_with_user.groupby('user_id').agg({
-            'reordered': ['mean', 'sum', 'std']
-        }).reset_index()
-        
-        reorder_stats.columns = [
-            'user_id',
-            'overall_reorder_rate',
-            'total_reordered_items',
-            'reorder_rate_std'
-        ]
-        
-        # Sipariş başına tekrar sipariş oranı (bazı kullanıcılar tutarlı bir şekilde tekrar sipariş verirken, diğerleri vermez)
-        reorder_per_order = order_products_with_user.groupby(['user_id', 'order_id'])['reordered'].mean().reset_index()
-        reorder_consistency = reorder_per_order.groupby('user_id')['reordered'].agg(['mean', 'std']).reset_index()
-        reorder_consistency.columns = ['user_id', 'avg_reorder_rate_per_order', 'reorder_consistency_std']
+        # pandas toplamı sığdığında girdi tipine (yükleyicide int8) geri çevirir; tip veriye
+        # bağlı kalmasın diye int64 sabitlenir
+        reorder_stats['total_reordered_items'] = reorder_stats['total_reordered_items'].astype(np.int64)
+        
+        # Sipariş başına tekrar sipariş oranı (bazı kullanıcılar tutarlı bir şekilde tekrar sipariş verirken, diğerleri vermez).
+        # Ara sonuç sıralanmaz ve çerçeveye dönüştürülmez; ikinci groupby doğrudan indeks düzeyinde yapılır
+        reorder_consistency = order_products_with_user\
+            .groupby(['user_id', 'order_id'], sort=False)['reordered'].mean()\
+            .groupby(level='user_id', sort=False).agg(
+                avg_reorder_rate_per_order='mean',
+                reorder_consistency_std='std'
+            )
         
         # Favori ürünler (5+ kez sipariş edilenler)
-        product_order_counts = order_products_with_user.groupby(['user_id', 'product_id']).size().reset_index()
-        product_order_counts.columns = ['user_id', 'product_id', 'times_ordered']
-        
-        favorite_products = product_order_counts[product_order_counts['times_ordered'] >= 5]\
-            .groupby('user_id').size().reset_index()
-        favorite_products.columns = ['user_id', 'favorite_products_count']
+        favorite_products = self._favorite_counts(
+            order_products_with_user['user_id'].to_numpy(),
+            order_products_with_user['product_id'].to_numpy()
+        )
         
-        # Birleştir
-        reorder_features = reorder_stats\
-            .merge(reorder_consistency, on='user_id')\
-            .merge(favorite_products, on='user_id', how='left')
+        # Birleştir (user_id indeksinde hizalama)
+        reorder_features = pd.concat([reorder_stats, reorder_consistency], axis=1)\
+            .join(favorite_products)\
+            .reset_index()
         
-        reorder_features['favorite_products_count'] = reorder_features['favorite_products_count'].fillna(0)
         reorder_features['reorder_rate_std'] = reorder_features['reorder_rate_std'].fillna(0)
         reorder_features['reorder_consistency_std'] = reorder_features['reorder_consistency_std'].fillna(0)
         
         return reorder_features
     
+    @staticmethod
+    def _favorite_counts(user_ids: np.ndarray, product_ids: np.ndarray, min_count: int = 5) -> pd.Series:
+        """
+        Kullanıcı başına en az min_count kez sipariş edilen ürün sayısı (favorisi olmayanlar 0).
+        
+        (kullanıcı, ürün) çiftleri tek bir int64 anahtarda birleştirilip sıralanır; ardışık eşit
+        anahtar koşuları çift sayımlarını, koşuların kullanıcı sınırlarında np.add.reduceat da
+        kullanıcı toplamlarını verir. İki sütunlu hash groupby ve ara sayım serisi oluşmaz.
+        Kimlikler negatif olmamalıdır.
+        """
+        if not user_ids.size:
+            return pd.Series([], index=pd.Index(user_ids, name='user_id'),
+                             name='favorite_products_count', dtype=np.int64)
+        
+        base = int(product_ids.max()) + 1
+        keys = np.sort(user_ids.astype(np.int64) * base + product_ids)
+        
+        pair_starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        is_favorite = np.diff(np.r_[pair_starts, keys.size]) >= min_count
+        pair_users = keys[pair_starts] // base
+        user_starts = np.flatnonzero(np.r_[True, pair_users[1:] != pair_users[:-1]])
+        
+        return pd.Series(
+            np.add.reduceat(is_favorite.astype(np.int64), user_starts),
+            index=pd.Index(pair_users[user_starts].astype(user_ids.dtype), name='user_id'),
+            name='favorite_products_count'
+        )
+    
     def create_diversity_features(self,
                                 orders_df: pd.DataFrame,
                                 order_products_df: pd.DataFrame,
-                                products_df: pd.DataFrame) -> pd.DataFrame:
+                                products_df: pd.DataFrame,
+                                order_products_with_user: Optional[pd.DataFrame] = None) -> pd.DataFrame:
         """
         Ürün çeşitliliği özellikleri.
         
@@ -203,34 +446,46 @@ class BehavioralFeatureEngineer:
         - product_diversity_score: Ürün çeşitliliği puanı.
         - avg_products_per_order: Sipariş başına ortalama ürün sayısı.
         - exploration_rate: Yeni ürünleri deneme oranı.
+        
+        order_products_with_user verilirse (_attach_user çıktısı) sipariş birleştirmesi tekrarlanmaz.
         """
 
         logger.info("Çeşitlilik özellikleri oluşturuluyor...")
         
-        # Reyon ve departman bilgilerini almak için birleştir
-        order_products_full = order_products_df\
-            .merge(orders_df[['order_id', 'user_id', 'order_number']], on='order_id')\
-            .merge(products_df[['product_id', 'aisle_id', 'department_id']], on='product_id')
-        
-        # Benzersiz sayımlar
-        diversity_stats = order_products_full.groupby('user_id').agg({
-            'product_id': 'nunique',
-            'aisle_id': 'nunique',
-            'department_id': 'nunique',
-            'order_id': 'nunique'
-        }).reset_index()
-        
-        diversity_stats.columns = [
-            'user_id',
-            'unique_products',
-            'unique_aisles',
-            'unique_departments',
-            'total_orders'
-        ]
+        if order_products_with_user is None:
+            order_products_with_user = self._attach_user(orders_df, order_products_df)
+        
+        # Reyon ve departman bilgileri: product_id küçük ve benzersiz bir anahtar olduğundan
+        # hash birleştirmesi yerine ürün kimliğiyle indekslenen konum tablosundan okunur.
+        # İç birleştirme gibi ürün tablosunda bulunmayan satırlar atılır.
+        product_ids = order_products_with_user['product_id'].to_numpy()
+        catalog_ids = products_df['product_id'].to_numpy()
+        lut = np.full(max(int(product_ids.max(initial=0)), int(catalog_ids.max(initial=0))) + 1,
+                      -1, dtype=np.intp)
+        lut[catalog_ids] = np.arange(len(catalog_ids))
+        positions = lut[product_ids]
+        rows = np.flatnonzero(positions >= 0) if (positions < 0).any() else slice(None)
+        positions = positions[rows]
+        order_products_full = pd.DataFrame({
+            col: order_products_with_user[col].to_numpy()[rows]
+            for col in ('order_id', 'product_id', 'user_id', 'order_number')
+        })
+        order_products_full['aisle_id'] = products_df['aisle_id'].to_numpy()[positions]
+        order_products_full['department_id'] = products_df['department_id'].to_numpy()[positions]
+        
+        # Benzersiz sayımlar ve satır sayısı: adlandırılmış toplamalar düz sütunlar üretir
+        # (MultiIndex/konumsal yeniden adlandırma yok); satır sayısı aynı groupby'da alınır
+        diversity_stats = order_products_full.groupby('user_id').agg(
+            unique_products=('product_id', 'nunique'),
+            unique_aisles=('aisle_id', 'nunique'),
+            unique_departments=('department_id', 'nunique'),
+            total_orders=('order_id', 'nunique'),
+            total_rows=('product_id', 'size')
+        ).reset_index()
         
         # Sipariş başına ürün sayısı
         diversity_stats['avg_products_per_order'] = (
-            order_products_full.groupby('user_id').size().values / 
+            diversity_stats.pop('total_rows') / 
             diversity_stats['total_orders']
         )
         
@@ -240,39 +495,154 @@ class BehavioralFeatureEngineer:
             (diversity_stats['total_orders'] * diversity_stats['avg_products_per_order'] + 1)
         )
         
-        # --- OPTİMİZE EDİLMİŞ KEŞİF ORANI HESAPLAMASI ---
-        def calculate_exploration(df_group):
-            if df_group.empty:
-                return 0
-            
-            mid_point = df_group['order_number'].median()
-            
-            early_products = set(df_group.loc[df_group['order_number'] <= mid_point, 'product_id'])
-            late_products = set(df_group.loc[df_group['order_number'] > mid_point, 'product_id'])
+        # --- KEŞİF ORANI ---
+        # Her satır, kullanıcının medyan order_number'ına göre erken (<=) veya geç (>) olarak
+        # işaretlenir. Bir ürün, kullanıcı için yalnızca geç satırlarda görülüyorsa "yeni"dir:
+        # keşif oranı = yalnızca geç görülen ürünler / geç dönemde görülen ürünler.
+        if njit is not None:
+            exploration_rate = self._exploration_rate_numba(order_products_full)
+        else:
+            order_numbers = order_products_full['order_number']
+            is_late = order_numbers.to_numpy() > \
+                order_numbers.groupby(order_products_full['user_id'], sort=False).transform('median').to_numpy()
+            product_phase = pd.DataFrame({
+                'user_id': order_products_full['user_id'].to_numpy(),
+                'product_id': order_products_full['product_id'].to_numpy(),
+                'is_late': is_late
+            }).groupby(['user_id', 'product_id'], sort=False)['is_late'].agg(['min', 'max'])
             
-            if len(late_products) > 0:
-                return len(late_products - early_products) / len(late_products)
-            return 0
-
-        # Fonksiyonu her kullanıcı grubuna uygula
-        exploration_df = order_products_full.groupby('user_id').apply(calculate_exploration).reset_index(name='exploration_rate')
-        
-        diversity_stats = diversity_stats.merge(exploration_df, on='user_id', how='left')
-        # --- OPTİMİZASYON SONU ---
+            # min=True: ürün hiç erken görülmemiş; max=True: ürün geç dönemde görülmüş
+            late_counts = product_phase.groupby(level='user_id').sum()
+            late_only = late_counts['min'].to_numpy()
+            late_total = late_counts['max'].to_numpy()
+            exploration_rate = pd.Series(
+                np.divide(late_only, late_total, out=np.zeros(len(late_counts)), where=late_total > 0),
+                index=late_counts.index, name='exploration_rate'
+            )
+        
+        diversity_stats = diversity_stats.join(exploration_rate, on='user_id')
 
         # Geçici sütunu kaldır
         diversity_stats = diversity_stats.drop('total_orders', axis=1)
         
         return diversity_stats
 
+    @staticmethod
+    def _exploration_rate_numba(order_products_full: pd.DataFrame) -> pd.Series:
+        """
+        create_diversity_features'taki keşif oranının Numba karşılığı: satırlar user_id'ye
+        göre (gerekirse) bir kez sıralanır ve her kullanıcı dilimi _segment_exploration ile
+        tek geçişte işlenir. Çıktı user_id'ye göre sıralı, pandas yoluyla aynı seridir.
+        """
+        users = order_products_full['user_id'].to_numpy()
+        order_numbers = order_products_full['order_number'].to_numpy()
+        products = order_products_full['product_id'].to_numpy()
+        if users.size and not (users[1:] >= users[:-1]).all():
+            # Dilim içindeki satır sırası sonucu etkilemez; kararsız sıralama belirgin şekilde hızlıdır
+            order = np.argsort(users)
+            users, order_numbers, products = users[order], order_numbers[order], products[order]
+        
+        bounds = np.flatnonzero(np.r_[True, users[1:] != users[:-1], True]) if users.size \
+            else np.zeros(1, dtype=np.intp)
+        rates = np.empty(bounds.size - 1)
+        _segment_exploration(bounds, order_numbers, products, int(products.max(initial=0)) + 1, rates)
+        
+        return pd.Series(rates, index=pd.Index(users[bounds[:-1]], name='user_id'),
+                         name='exploration_rate')
+    
+    @staticmethod
+    def _reorder_diversity_polars(orders_df: pd.DataFrame,
+                                  order_products_df: pd.DataFrame,
+                                  products_df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        create_reorder_features ve create_diversity_features'ın Polars karşılığı (aynı sütunlar
+        ve değerler). Her iki grup aynı sipariş birleştirmesinden türetilir; collect_all ile
+        birlikte çalıştırıldığında ortak alt sorgular bir kez hesaplanır.
+        """
+        if pl is None:
+            raise ImportError("backend='polars' için polars paketi gerekli: pip install polars")
+        
+        orders = pl.from_pandas(orders_df[['order_id', 'user_id', 'order_number']]).lazy()
+        order_products = pl.from_pandas(order_products_df[['order_id', 'product_id', 'reordered']]).lazy()
+        products = pl.from_pandas(products_df[['product_id', 'aisle_id', 'department_id']]).lazy()
+        
+        # _attach_user karşılığı (iç birleştirme)
+        with_user = order_products.join(orders, on='order_id')
+        
+        # --- Tekrar sipariş ---
+        reorder_stats = with_user.group_by('user_id').agg(
+            pl.col('reordered').mean().alias('overall_reorder_rate'),
+            pl.col('reordered').sum().cast(pl.Int64).alias('total_reordered_items'),
+            pl.col('reordered').std().fill_null(0).alias('reorder_rate_std')
+        )
+        reorder_consistency = with_user.group_by('user_id', 'order_id')\
+            .agg(pl.col('reordered').mean())\
+            .group_by('user_id').agg(
+                pl.col('reordered').mean().alias('avg_reorder_rate_per_order'),
+                pl.col('reordered').std().fill_null(0).alias('reorder_consistency_std')
+            )
+        favorite_products = with_user.group_by('user_id', 'product_id').len()\
+            .group_by('user_id').agg(
+                (pl.col('len') >= 5).sum().cast(pl.Int64).alias('favorite_products_count')
+            )
+        reorder_features = reorder_stats\
+            .join(reorder_consistency, on='user_id')\
+            .join(favorite_products, on='user_id')
+        
+        # --- Çeşitlilik ---
+        full = with_user.join(products, on='product_id')
+        diversity_stats = full.group_by('user_id').agg(
+            pl.col('product_id').n_unique().cast(pl.Int64).alias('unique_products'),
+            pl.col('aisle_id').n_unique().cast(pl.Int64).alias('unique_aisles'),
+            pl.col('department_id').n_unique().cast(pl.Int64).alias('unique_departments'),
+            pl.col('order_id').n_unique().alias('total_orders'),
+            pl.len().alias('n_rows')
+        ).with_columns(
+            (pl.col('n_rows') / pl.col('total_orders')).alias('avg_products_per_order')
+        ).with_columns(
+            (pl.col('unique_products') /
+             (pl.col('total_orders') * pl.col('avg_products_per_order') + 1)).alias('product_diversity_score')
+        )
+        # Keşif oranı: pandas yolundaki medyan order_number'a göre erken/geç ayrımı
+        is_late = pl.col('order_number') > pl.col('order_number').median().over('user_id')
+        exploration_rate = full.with_columns(is_late.alias('is_late'))\
+            .group_by('user_id', 'product_id')\
+            .agg(pl.col('is_late').min().alias('late_only'), pl.col('is_late').max().alias('late_seen'))\
+            .group_by('user_id')\
+            .agg(pl.col('late_only').sum(), pl.col('late_seen').sum())\
+            .select('user_id', pl.when(pl.col('late_seen') > 0)
+                    .then(pl.col('late_only') / pl.col('late_seen'))
+                    .otherwise(0.0).alias('exploration_rate'))
+        diversity_features = diversity_stats.join(exploration_rate, on='user_id').select(
+            'user_id', 'unique_products', 'unique_aisles', 'unique_departments',
+            'avg_products_per_order', 'product_diversity_score', 'exploration_rate'
+        )
+        
+        reorder_features, diversity_features = pl.collect_all([reorder_features, diversity_features])
+        return reorder_features.to_pandas(), diversity_features.to_pandas()
+
     def get_feature_names(self) -> List[str]:
         """Özellik adlarının bir listesini döndürür."""
         return self.feature_names
+    
+    @staticmethod
+    def save_features(features_df: pd.DataFrame, filepath: Path) -> None:
+        """
+        Özellik tablosunu Parquet olarak kaydeder (data_loader.save_processed_data ile aynı
+        ZSTD seviye 3 sıkıştırma ve satır grubu boyutu; sütunlar sözlük kodlamalıdır).
+        """
+        filepath = Path(filepath)
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        features_df.to_parquet(filepath, index=False, engine='pyarrow',
+                               compression='zstd', compression_level=3,
+                               row_group_size=256_000)
+        logger.info(f"Davranışsal özellikler kaydedildi: {filepath}")
 
 
 def create_behavioral_features_pipeline(orders_df: pd.DataFrame,
                                         order_products_df: pd.DataFrame,
-                                        products_df: pd.DataFrame) -> pd.DataFrame:
+                                        products_df: pd.DataFrame,
+                                        backend: str = 'pandas') -> pd.DataFrame:
     """
     Tüm davranışsal özellikleri oluşturmak için hızlı bir pipeline.
     
@@ -280,13 +650,14 @@ def create_behavioral_features_pipeline(orders_df: pd.DataFrame,
         orders_df: Siparişler veri çerçevesi.
         order_products_df: Sipariş ürünleri veri çerçevesi.
         products_df: Ürünler veri çerçevesi.
+        backend: 'pandas' (varsayılan) veya 'polars' (bkz. create_all_behavioral_features).
         
     Returns:
         Kullanıcı düzeyinde davranışsal özelliklere sahip bir veri çerçevesi.
     """
     engineer = BehavioralFeatureEngineer()
     behavioral_features = engineer.create_all_behavioral_features(
-        orders_df, order_products_df, products_df
+        orders_df, order_products_df, products_df, backend=backend
     )
     
     return behavioral_features
@@ -305,10 +676,8 @@ if __name__ == "__main__":
     data = loader.load_all_data()
     
     orders_df = data['orders']
-    order_products = pd.concat([
-        data['order_products_prior'],
-        data['order_products_train']
-    ])
+    # Yalnızca özelliklerin okuduğu sütunlar birleştirilir; kullanılmayan sütunlar kopyalanmaz
+    order_products = loader.merge_order_products(columns=['order_id', 'product_id', 'reordered'])
     products_df = data['products']
     
     # Davranışsal özellikleri oluştur
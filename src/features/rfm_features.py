@@ -6,13 +6,92 @@ Yenilik (Recency), Sıklık (Frequency) ve Parasal (Monetary) özellikleri oluş
 
 import pandas as pd
 import numpy as np
-from typing import Dict, List
+import hashlib
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 import logging
 
+# Polars isteğe bağlıdır; yalnızca create_all_rfm_features(backend='polars') için gerekir
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
+# Numba isteğe bağlıdır; yoksa sepet büyüklükleri sıralama tabanlı NumPy yoluyla, kullanıcı
+# toplamaları pandas groupby ile hesaplanır
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+if njit is not None:
+    # cache=True kullanılmıyor (bkz. churn_labels._label_churn: modül iki farklı adla içe aktarılıyor)
+    @njit
+    def _run_basket_sizes(bounds, product, n_products, sizes, uniques):
+        """
+        Her sipariş koşusu [bounds[s], bounds[s+1]) için satır sayısını ve benzersiz ürün
+        sayısını tek geçişte yazar. Görülen ürünler ürün kimliğiyle indekslenen bir damga
+        dizisinde tutulur (hash kümesi ve koşular arasında sıfırlama yok).
+        """
+        stamp = np.zeros(n_products, np.int64)
+        for s in range(bounds.shape[0] - 1):
+            lo = bounds[s]
+            hi = bounds[s + 1]
+            distinct = 0
+            for i in range(lo, hi):
+                p = product[i]
+                if stamp[p] != s + 1:
+                    stamp[p] = s + 1
+                    distinct += 1
+            sizes[s] = hi - lo
+            uniques[s] = distinct
+
+    @njit
+    def _nan_moments(x, lo, hi):
+        """x[lo:hi] için NaN'ları atlayarak toplam, ortalama ve std (ddof=1); pandas gibi boş
+        dilimde toplam 0, ortalama NaN; ikiden az değerde std NaN döner."""
+        n = 0
+        total = 0.0
+        for i in range(lo, hi):
+            if not np.isnan(x[i]):
+                n += 1
+                total += x[i]
+        mean = total / n if n > 0 else np.nan
+        ss = 0.0
+        for i in range(lo, hi):
+            if not np.isnan(x[i]):
+                ss += (x[i] - mean) ** 2
+        std = np.sqrt(ss / (n - 1)) if n > 1 else np.nan
+        return total, mean, std
+
+    @njit(parallel=True)
+    def _segment_user_aggregates(bounds, order_number, days, basket, unique,
+                                 first_last, sums, means, stds):
+        """
+        user_id'ye göre sıralı siparişlerde her kullanıcı dilimi [bounds[s], bounds[s+1]) için
+        ilk/son sipariş numarasını ve gün, sepet büyüklüğü ve benzersiz ürün sütunlarının
+        (sırasıyla 0, 1, 2. sütun) toplam, ortalama ve std değerlerini yazar. Dilimler
+        birbirinden bağımsız olduğundan kullanıcılar üzerinde paralel döner.
+        """
+        for s in prange(bounds.shape[0] - 1):
+            lo = bounds[s]
+            hi = bounds[s + 1]
+            first = order_number[lo]
+            last = order_number[lo]
+            for i in range(lo + 1, hi):
+                first = min(first, order_number[i])
+                last = max(last, order_number[i])
+            first_last[s, 0] = first
+            first_last[s, 1] = last
+            sums[s, 0], means[s, 0], stds[s, 0] = _nan_moments(days, lo, hi)
+            sums[s, 1], means[s, 1], stds[s, 1] = _nan_moments(basket, lo, hi)
+            sums[s, 2], means[s, 2], stds[s, 2] = _nan_moments(unique, lo, hi)
+
+
 class RFMFeatureEngineer:
     """
     RFM (Yenilik, Sıklık, Parasal) özellikleri oluşturur.
@@ -23,40 +102,100 @@ class RFMFeatureEngineer:
     - Parasal (Monetary): Parasal değer (sepet büyüklüğünü vekil olarak kullanarak).
     """
     
+    # Skoru hesaplanan sütunlar ve skor yönü (True: düşük değer yüksek skor)
+    _SCORE_COLUMNS = {
+        'recency_score': ('days_since_last_order', True),
+        'frequency_score': ('total_orders', False),
+        'monetary_score': ('avg_basket_size', False)
+    }
+    
+    # _user_order_summary ve _user_aggregates'in ortak adlandırılmış toplamaları
+    _SUMMARY_AGGS = {
+        'total_orders': ('order_id', 'count'),
+        'first_order_number': ('order_number', 'min'),
+        'last_order_number': ('order_number', 'max'),
+        'avg_days_between_orders': ('days_since_prior_order', 'mean'),
+        'std_days_between_orders': ('days_since_prior_order', 'std')
+    }
+    _MONETARY_AGGS = {
+        'avg_basket_size': ('basket_size', 'mean'),
+        'total_items_ordered': ('basket_size', 'sum'),
+        'basket_size_std': ('basket_size', 'std'),
+        'avg_unique_products_per_order': ('unique_products_in_order', 'mean'),
+        'total_unique_products_ordered': ('unique_products_in_order', 'sum')
+    }
+    
+    # Toplama girdilerinin tipleri: yükleyici order_number'ı int16, gün sütununu float32 okur;
+    # türetilen gün özellikleri (ör. order_span * 7) ve defterlerdeki karesi/çarpımları int16'da
+    # taşar, bu yüzden toplamalar geniş tiplerle yapılır (ham CSV varsayılanlarıyla aynı çıktı)
+    _INPUT_DTYPES = {'order_number': np.int64, 'days_since_prior_order': np.float64}
+    
     def __init__(self):
         self.feature_names = []
+        # create_rfm_score(fit=True) ile öğrenilen beşli dilim sınırları (skor adı -> 4 sınır)
+        self.score_edges: Dict[str, np.ndarray] = {}
     
     def create_all_rfm_features(self, 
                                 orders_df: pd.DataFrame,
-                                order_products_df: pd.DataFrame) -> pd.DataFrame:
+                                order_products_df: pd.DataFrame,
+                                backend: str = 'pandas',
+                                float32: bool = False) -> pd.DataFrame:
         """
         Tüm RFM özelliklerini oluşturur.
         
         Args:
             orders_df: Siparişler veri çerçevesi.
             order_products_df: Sipariş ürünleri veri çerçevesi.
+            backend: 'pandas' (varsayılan) veya 'polars'. Polars, kullanıcı ve sepet
+                     toplamalarını çok iş parçacıklı tek bir sorguda hesaplar; kullanıcı
+                     düzeyindeki türetilmiş özellikler her iki yolda da aynı koddan geçer.
+            float32: True ise float64 sütunlar float32 olarak döner (davranışsal özelliklerdeki
+                     aynı adlı seçenek gibi isteğe bağlı; kayıtlı modeller float64 ile eğitildi).
             
         Returns:
             Kullanıcı düzeyinde RFM özelliklerine sahip bir veri çerçevesi.
         """
+        if backend not in ('pandas', 'polars'):
+            raise ValueError(f"Desteklenmeyen backend: {backend}")
+        
         logger.info("RFM özellikleri oluşturuluyor...")
         
+        # Yenilik, sıklık ve parasal özelliklerin kullanıcı toplamaları siparişler üzerinde
+        # tek bir groupby ile hesaplanır
+        if backend == 'polars':
+            user_summary, user_monetary = self._user_aggregates_polars(orders_df, order_products_df)
+        else:
+            user_summary, user_monetary = self._user_aggregates(orders_df, order_products_df)
+        
         # Yenilik özellikleri
-        recency_features = self.create_recency_features(orders_df)
+        recency_features = self.create_recency_features(orders_df, user_summary)
         
         # Sıklık özellikleri
-        frequency_features = self.create_frequency_features(orders_df)
+        frequency_features = self.create_frequency_features(orders_df, user_summary)
         
         # Parasal özellikler (sepet büyüklüğünü vekil olarak kullanarak)
-        monetary_features = self.create_monetary_features(orders_df, order_products_df)
-        
-        # Hepsini birleştir
-        rfm_features = recency_features\
-            .merge(frequency_features, on='user_id', how='outer')\
-            .merge(monetary_features, on='user_id', how='outer')
-        
-        # NaN değerlerini 0 ile doldur
-        rfm_features = rfm_features.fillna(0)
+        monetary_features = self.create_monetary_features(orders_df, order_products_df, user_monetary)
+        
+        # Hepsini birleştir: parçalar user_id indeksli döner; indekste hizalama (dış birleştirme)
+        # hash-join gerektirmez, user_id sütunu en sonda bir kez geri alınır
+        parts = [recency_features, frequency_features, monetary_features]
+        rfm_features = pd.concat(parts, axis=1).sort_index()
+        
+        # NaN değerlerini 0 ile doldur. NaN yalnızca tek siparişli kullanıcıların gün ortalamasında,
+        # hiç ürünü olmayan siparişlerden oluşan kullanıcıların sepet ortalamalarında ve bir
+        # parçada bulunmayan kullanıcılarda (dış birleştirme) oluşur; yalnızca bu sütunlar doldurulur.
+        nullable = ['avg_days_between_orders', 'avg_basket_size', 'basket_size_cv',
+                    'avg_unique_products_per_order']
+        for part in parts:
+            if len(part) != len(rfm_features):
+                nullable.extend(part.columns)
+        for col in dict.fromkeys(nullable):
+            rfm_features[col] = rfm_features[col].fillna(0)
+        rfm_features = rfm_features.reset_index()
+        
+        if float32:
+            float_cols = rfm_features.select_dtypes('float64').columns
+            rfm_features[float_cols] = rfm_features[float_cols].astype(np.float32)
         
         self.feature_names = [col for col in rfm_features.columns if col != 'user_id']
         
@@ -65,7 +204,201 @@ class RFMFeatureEngineer:
         
         return rfm_features
     
-    def create_recency_features(self, orders_df: pd.DataFrame) -> pd.DataFrame:
+    @staticmethod
+    def _user_order_summary(orders_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Yenilik ve sıklık özelliklerinin ortak kullandığı kullanıcı düzeyi sipariş özeti.
+        
+        Adlandırılmış toplamalar düz sütunlar üretir (MultiIndex düzleştirmeye gerek yok);
+        yalnızca özelliklerde kullanılan istatistikler hesaplanır. Sonuç user_id indekslidir.
+        """
+        orders = orders_df[['user_id', 'order_id', 'order_number', 'days_since_prior_order']]\
+            .astype(RFMFeatureEngineer._INPUT_DTYPES)
+        return orders.groupby('user_id').agg(**RFMFeatureEngineer._SUMMARY_AGGS)
+    
+    @classmethod
+    def _user_aggregates(cls,
+                         orders_df: pd.DataFrame,
+                         order_products_df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Kullanıcı özeti (_user_order_summary) ve kullanıcı düzeyi sepet toplamasını siparişler
+        üzerinde tek bir groupby ile hesaplar.
+        
+        Sipariş başına sepet büyüklükleri sipariş satırlarına konumla hizalanır (sol
+        birleştirme gibi: ürünü olmayan siparişlerde NaN); ayrı bir birleştirme ve ikinci bir
+        kullanıcı groupby'ı gerekmez. Numba varsa groupby yerine _user_aggregates_numba kullanılır.
+        """
+        basket_sizes = cls._basket_sizes(
+            order_products_df['order_id'].to_numpy(),
+            order_products_df['product_id'].to_numpy()
+        )
+        positions = pd.Index(basket_sizes['order_id']).get_indexer(orders_df['order_id'])
+        missing = positions < 0
+        
+        baskets = {}
+        for col in ('basket_size', 'unique_products_in_order'):
+            values = basket_sizes[col].to_numpy()[positions]
+            if missing.any():
+                values = np.where(missing, np.nan, values)
+            baskets[col] = values
+        
+        if njit is not None:
+            user_aggregates = cls._user_aggregates_numba(orders_df, baskets['basket_size'],
+                                                         baskets['unique_products_in_order'])
+        else:
+            orders = orders_df[['user_id', 'order_id', 'order_number', 'days_since_prior_order']]\
+                .astype(cls._INPUT_DTYPES)
+            for col, values in baskets.items():
+                orders[col] = values
+            user_aggregates = orders.groupby('user_id').agg(**cls._SUMMARY_AGGS, **cls._MONETARY_AGGS)
+        return user_aggregates[list(cls._SUMMARY_AGGS)], user_aggregates[list(cls._MONETARY_AGGS)]
+    
+    @staticmethod
+    def _user_aggregates_numba(orders_df: pd.DataFrame,
+                               basket_size: np.ndarray,
+                               unique_products: np.ndarray) -> pd.DataFrame:
+        """
+        _user_aggregates'teki groupby'ın Numba karşılığı: siparişler user_id'ye göre (gerekirse)
+        bir kez sıralanır ve kullanıcı dilimleri _segment_user_aggregates ile paralel işlenir.
+        Sütunlar, tipler (_INPUT_DTYPES ile genişletilmiş girdiler) ve user_id indeksi
+        groupby.agg ile aynıdır; çekirdek zaten int64/float64 biriktirir.
+        """
+        users = orders_df['user_id'].to_numpy()
+        order_number = orders_df['order_number'].to_numpy()
+        days = orders_df['days_since_prior_order'].to_numpy()
+        basket = basket_size.astype(np.float64, copy=False)
+        unique = unique_products.astype(np.float64, copy=False)
+        # Instacart orders.csv zaten user_id'ye göre sıralıdır; değilse bir kez sıralanır. Dilim
+        # içindeki sıra yalnızca toplama sırasını (son basamak yuvarlaması) etkiler; kararsız
+        # sıralama belirgin şekilde hızlıdır
+        if users.size and not (users[1:] >= users[:-1]).all():
+            order = np.argsort(users)
+            users, order_number, days = users[order], order_number[order], days[order]
+            basket, unique = basket[order], unique[order]
+        
+        bounds = np.flatnonzero(np.r_[True, users[1:] != users[:-1], True]) if users.size \
+            else np.zeros(1, dtype=np.intp)
+        n_users = bounds.size - 1
+        first_last = np.empty((n_users, 2), dtype=np.int64)
+        sums = np.empty((n_users, 3))
+        means = np.empty((n_users, 3))
+        stds = np.empty((n_users, 3))
+        _segment_user_aggregates(bounds, order_number, days, basket, unique,
+                                 first_last, sums, means, stds)
+        
+        # Sepet toplamları yalnızca eksik sepet yoksa tamsayıdır (pandas yoluyla aynı)
+        total_dtype = np.int64 if basket_size.dtype.kind in 'iu' else np.float64
+        return pd.DataFrame({
+            'total_orders': np.diff(bounds).astype(np.int64),
+            'first_order_number': first_last[:, 0],
+            'last_order_number': first_last[:, 1],
+            'avg_days_between_orders': means[:, 0],
+            'std_days_between_orders': stds[:, 0],
+            'avg_basket_size': means[:, 1],
+            'total_items_ordered': sums[:, 1].astype(total_dtype),
+            'basket_size_std': stds[:, 1],
+            'avg_unique_products_per_order': means[:, 2],
+            'total_unique_products_ordered': sums[:, 2].astype(total_dtype)
+        }, index=pd.Index(users[bounds[:-1]], name='user_id'))
+    
+    @staticmethod
+    def _user_aggregates_polars(orders_df: pd.DataFrame,
+                                order_products_df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        _user_order_summary ve create_monetary_features'taki kullanıcı düzeyi sepet
+        toplamasının Polars karşılığı (aynı sütunlar ve user_id indeksi; pandas gibi eksik
+        değerler atlanır).
+        """
+        if pl is None:
+            raise ImportError("backend='polars' için polars paketi gerekli: pip install polars")
+        
+        # from_pandas NaN'ları null'a çevirir; mean/std/sum null'ları pandas gibi atlar.
+        # Girdiler pandas yoluyla aynı şekilde genişletilir (_INPUT_DTYPES)
+        orders = pl.from_pandas(orders_df[['order_id', 'user_id', 'order_number',
+                                           'days_since_prior_order']]).lazy()\
+            .with_columns(pl.col('order_number').cast(pl.Int64),
+                          pl.col('days_since_prior_order').cast(pl.Float64))
+        order_products = pl.from_pandas(order_products_df[['order_id', 'product_id']]).lazy()
+        
+        user_summary = orders.group_by('user_id').agg(
+            pl.col('order_id').count().cast(pl.Int64).alias('total_orders'),
+            pl.col('order_number').min().alias('first_order_number'),
+            pl.col('order_number').max().alias('last_order_number'),
+            pl.col('days_since_prior_order').mean().alias('avg_days_between_orders'),
+            pl.col('days_since_prior_order').std().alias('std_days_between_orders')
+        ).sort('user_id')
+        
+        basket_sizes = order_products.group_by('order_id').agg(
+            pl.col('product_id').count().alias('basket_size'),
+            pl.col('product_id').n_unique().alias('unique_products_in_order')
+        )
+        user_monetary = orders.select('order_id', 'user_id')\
+            .join(basket_sizes, on='order_id', how='left')\
+            .group_by('user_id').agg(
+                pl.col('basket_size').mean().alias('avg_basket_size'),
+                pl.col('basket_size').sum().cast(pl.Int64).alias('total_items_ordered'),
+                pl.col('basket_size').std().alias('basket_size_std'),
+                pl.col('unique_products_in_order').mean().alias('avg_unique_products_per_order'),
+                pl.col('unique_products_in_order').sum().cast(pl.Int64)
+                    .alias('total_unique_products_ordered'),
+                pl.col('basket_size').null_count().alias('missing_baskets')
+            ).sort('user_id')
+        
+        user_summary, user_monetary = pl.collect_all([user_summary, user_monetary])
+        user_monetary = user_monetary.to_pandas().set_index('user_id')
+        
+        # pandas yolunda ürünü olmayan siparişler (ör. test) sol birleştirmede NaN olur ve
+        # toplamlar float64'e döner; sütun tipleri aynı kalsın diye bu durum yansıtılır
+        if user_monetary.pop('missing_baskets').any():
+            totals = ['total_items_ordered', 'total_unique_products_ordered']
+            user_monetary[totals] = user_monetary[totals].astype(np.float64)
+        return user_summary.to_pandas().set_index('user_id'), user_monetary
+    
+    @staticmethod
+    def _basket_sizes(order_ids: np.ndarray, product_ids: np.ndarray) -> pd.DataFrame:
+        """
+        Sipariş başına satır sayısı (basket_size) ve benzersiz ürün sayısı
+        (unique_products_in_order); groupby('order_id') ile count ve nunique karşılığı.
+        
+        (sipariş, ürün) çiftleri tek bir int64 anahtarda birleştirilip bir kez sıralanır:
+        sipariş koşularının uzunluğu sepet büyüklüğünü, koşu içindeki farklı anahtarların
+        sayısı (np.add.reduceat) benzersiz ürün sayısını verir. Kimlikler negatif olmamalıdır.
+        
+        Numba varsa ve her siparişin satırları bitişikse (Instacart CSV'leri order_id'ye göre
+        sıralıdır) sıralama yapılmaz; koşular _run_basket_sizes ile tek geçişte sayılır.
+        """
+        if not order_ids.size:
+            return pd.DataFrame({'order_id': order_ids,
+                                 'basket_size': np.zeros(0, dtype=np.int64),
+                                 'unique_products_in_order': np.zeros(0, dtype=np.int64)})
+        
+        if njit is not None:
+            bounds = np.flatnonzero(np.r_[True, order_ids[1:] != order_ids[:-1], True])
+            run_orders = order_ids[bounds[:-1]]
+            if pd.Index(run_orders).is_unique:
+                sizes = np.empty(run_orders.size, dtype=np.int64)
+                uniques = np.empty(run_orders.size, dtype=np.int64)
+                _run_basket_sizes(bounds, product_ids, int(product_ids.max()) + 1, sizes, uniques)
+                return pd.DataFrame({'order_id': run_orders,
+                                     'basket_size': sizes,
+                                     'unique_products_in_order': uniques})
+        
+        base = int(product_ids.max()) + 1
+        keys = np.sort(order_ids.astype(np.int64) * base + product_ids)
+        orders = keys // base
+        
+        order_starts = np.flatnonzero(np.r_[True, orders[1:] != orders[:-1]])
+        is_new_product = np.r_[True, keys[1:] != keys[:-1]]
+        
+        return pd.DataFrame({
+            'order_id': orders[order_starts].astype(order_ids.dtype),
+            'basket_size': np.diff(np.r_[order_starts, keys.size]),
+            'unique_products_in_order': np.add.reduceat(is_new_product.astype(np.int64), order_starts)
+        })
+    
+    def create_recency_features(self,
+                                orders_df: pd.DataFrame,
+                                user_summary: Optional[pd.DataFrame] = None) -> pd.DataFrame:
         """
         Yenilik özellikleri.
         
@@ -73,24 +406,26 @@ class RFMFeatureEngineer:
         - days_since_last_order: Son siparişten bu yana geçen gün sayısı.
         - days_since_first_order: İlk siparişten bu yana geçen gün sayısı.
         - customer_age_days: Müşteri yaşı (gün olarak).
+        
+        Args:
+            orders_df: Siparişler veri çerçevesi.
+            user_summary: Önceden hesaplanmış kullanıcı özeti (verilmezse orders_df'ten hesaplanır).
+            
+        Returns:
+            user_id indeksli yenilik özellikleri.
         """
         logger.info("Yenilik özellikleri oluşturuluyor...")
         
-        user_recency = orders_df.groupby('user_id').agg({
-            'order_number': ['min', 'max'],
-            'days_since_prior_order': ['mean', 'sum']
-        }).reset_index()
-        
-        user_recency.columns = [
-            'user_id', 
-            'first_order_number', 
-            'last_order_number',
-            'avg_days_between_orders',
-            'total_days_since_prior'
-        ]
+        if user_summary is None:
+            user_summary = self._user_order_summary(orders_df)
+        
+        user_recency = user_summary[
+            ['first_order_number', 'last_order_number', 'avg_days_between_orders']
+        ].copy()
         
-        # Genel maksimum sipariş numarası (referans noktası - "şimdi")
-        global_max = orders_df['order_number'].max()
+        # Genel maksimum sipariş numarası (referans noktası - "şimdi").
+        # Kullanıcı maksimumlarının maksimumu: tüm siparişler yerine O(kullanıcı) tarama.
+        global_max = user_recency['last_order_number'].max()
         
         # Yenilik hesaplamaları
         user_recency['orders_since_last'] = global_max - user_recency['last_order_number']
@@ -104,7 +439,6 @@ class RFMFeatureEngineer:
         
         # Nihai özellikleri seç
         recency_cols = [
-            'user_id',
             'days_since_last_order',
             'days_since_first_order', 
             'customer_age_days',
@@ -113,7 +447,9 @@ class RFMFeatureEngineer:
         
         return user_recency[recency_cols]
     
-    def create_frequency_features(self, orders_df: pd.DataFrame) -> pd.DataFrame:
+    def create_frequency_features(self,
+                                  orders_df: pd.DataFrame,
+                                  user_summary: Optional[pd.DataFrame] = None) -> pd.DataFrame:
         """
         Sıklık özellikleri.
         
@@ -122,25 +458,21 @@ class RFMFeatureEngineer:
         - orders_per_day: Günlük ortalama sipariş sayısı.
         - order_frequency: Sipariş sıklığı puanı.
         - order_regularity: Sipariş düzenliliği (düşük standart sapma daha düzenli demektir).
+        
+        Args:
+            orders_df: Siparişler veri çerçevesi.
+            user_summary: Önceden hesaplanmış kullanıcı özeti (verilmezse orders_df'ten hesaplanır).
+            
+        Returns:
+            user_id indeksli sıklık özellikleri.
         """
         logger.info("Sıklık özellikleri oluşturuluyor...")
         
-        user_frequency = orders_df.groupby('user_id').agg({
-            'order_id': 'count',
-            'order_number': ['min', 'max'],
-            'days_since_prior_order': ['mean', 'std', 'min', 'max']
-        }).reset_index()
+        if user_summary is None:
+            user_summary = self._user_order_summary(orders_df)
         
-        user_frequency.columns = [
-            'user_id',
-            'total_orders',
-            'first_order_number',
-            'last_order_number',
-            'avg_days_between_orders',
-            'std_days_between_orders',
-            'min_days_between_orders',
-            'max_days_between_orders'
-        ]
+        # Paylaşılan özet yerinde değiştirilmemeli
+        user_frequency = user_summary.copy()
         
         # Türetilmiş özellikler
         user_frequency['order_span'] = user_frequency['last_order_number'] - user_frequency['first_order_number']
@@ -161,7 +493,6 @@ class RFMFeatureEngineer:
         
         # Nihai özellikleri seç
         frequency_cols = [
-            'user_id',
             'total_orders',
             'orders_per_day',
             'order_regularity',
@@ -172,7 +503,8 @@ class RFMFeatureEngineer:
     
     def create_monetary_features(self, 
                                  orders_df: pd.DataFrame,
-                                 order_products_df: pd.DataFrame) -> pd.DataFrame:
+                                 order_products_df: pd.DataFrame,
+                                 user_monetary: Optional[pd.DataFrame] = None) -> pd.DataFrame:
         """
         Parasal özellikler.
         
@@ -183,37 +515,24 @@ class RFMFeatureEngineer:
         - total_products_ordered: Sipariş edilen toplam ürün sayısı.
         - avg_unique_products: Sipariş başına ortalama benzersiz ürün.
         - basket_size_std: Sepet büyüklüğünün değişkenliği.
+        
+        Args:
+            orders_df: Siparişler veri çerçevesi.
+            order_products_df: Sipariş ürünleri veri çerçevesi.
+            user_monetary: Önceden hesaplanmış kullanıcı düzeyi sepet toplaması
+                           (verilmezse order_products_df'ten hesaplanır).
+            
+        Returns:
+            user_id indeksli parasal özellikler.
         """
         logger.info("Parasal özellikler oluşturuluyor (sepet büyüklüğünü vekil olarak kullanarak)...")
         
-        # Sipariş başına sepet büyüklüğünü hesapla
-        basket_sizes = order_products_df.groupby('order_id').agg({
-            'product_id': ['count', 'nunique']
-        }).reset_index()
-        
-        basket_sizes.columns = ['order_id', 'basket_size', 'unique_products_in_order']
-        
-        # user_id'yi almak için siparişlerle birleştir
-        baskets_with_user = orders_df[['order_id', 'user_id']].merge(
-            basket_sizes, on='order_id', how='left'
-        )
-        
-        # Kullanıcı düzeyinde toplama
-        user_monetary = baskets_with_user.groupby('user_id').agg({
-            'basket_size': ['mean', 'sum', 'std', 'min', 'max'],
-            'unique_products_in_order': ['mean', 'sum']
-        }).reset_index()
-        
-        user_monetary.columns = [
-            'user_id',
-            'avg_basket_size',
-            'total_items_ordered',
-            'basket_size_std',
-            'min_basket_size',
-            'max_basket_size',
-            'avg_unique_products_per_order',
-            'total_unique_products_ordered'
-        ]
+        if user_monetary is None:
+            # Sipariş başına sepet büyüklükleri ve kullanıcı düzeyinde toplama
+            _, user_monetary = self._user_aggregates(orders_df, order_products_df)
+        else:
+            # Paylaşılan/verilen toplama yerinde değiştirilmemeli
+            user_monetary = user_monetary.copy()
         
         # NaN değerlerini doldur
         user_monetary['basket_size_std'] = user_monetary['basket_size_std'].fillna(0)
@@ -226,7 +545,6 @@ class RFMFeatureEngineer:
         
         # Nihai özellikleri seç
         monetary_cols = [
-            'user_id',
             'avg_basket_size',
             'total_items_ordered',
             'basket_size_std',
@@ -237,7 +555,7 @@ class RFMFeatureEngineer:
         
         return user_monetary[monetary_cols]
     
-    def create_rfm_score(self, rfm_features: pd.DataFrame) -> pd.DataFrame:
+    def create_rfm_score(self, rfm_features: pd.DataFrame, fit: bool = True) -> pd.DataFrame:
         """
         RFM skorunu hesaplar (1-5 arası bir ölçekte).
         
@@ -246,42 +564,29 @@ class RFMFeatureEngineer:
         
         Args:
             rfm_features: RFM özellikleri veri çerçevesi.
+            fit: True (varsayılan) ise beşli dilim sınırları bu veriden hesaplanıp
+                 self.score_edges'e kaydedilir. False ise daha önce kaydedilen sınırlar
+                 kullanılır; tahmin verisi eğitimdeki sınırlarla skorlanır ve kendi
+                 dağılımına göre yeniden dilimlenmez.
             
         Returns:
             RFM skorlarını içeren bir veri çerçevesi.
         """
         logger.info("RFM skorları hesaplanıyor...")
         
-        rfm_scored = rfm_features.copy()
+        if not fit and not self.score_edges:
+            raise ValueError("fit=False için önce create_rfm_score(fit=True) ile sınırlar öğrenilmeli")
         
-        # Yenilik skoru (düşük olması daha iyidir, bu yüzden etiketleri ters çeviriyoruz)
-        rfm_scored['recency_score'] = pd.qcut(
-            rfm_scored['days_since_last_order'], 
-            q=5, 
-            labels=[5, 4, 3, 2, 1],
-            duplicates='drop'
-        )
-        
-        # Sıklık skoru (yüksek olması daha iyidir)
-        rfm_scored['frequency_score'] = pd.qcut(
-            rfm_scored['total_orders'], 
-            q=5, 
-            labels=[1, 2, 3, 4, 5],
-            duplicates='drop'
-        )
-        
-        # Parasal skor (yüksek olması daha iyidir)
-        rfm_scored['monetary_score'] = pd.qcut(
-            rfm_scored['avg_basket_size'], 
-            q=5, 
-            labels=[1, 2, 3, 4, 5],
-            duplicates='drop'
-        )
+        rfm_scored = rfm_features.copy()
         
-        # Tam sayıya dönüştür
-        rfm_scored['recency_score'] = rfm_scored['recency_score'].astype(int)
-        rfm_scored['frequency_score'] = rfm_scored['frequency_score'].astype(int)
-        rfm_scored['monetary_score'] = rfm_scored['monetary_score'].astype(int)
+        # Yenilik skoru düşük değerde yüksektir (skor ters çevrilir); sıklık ve parasal
+        # skorlar yüksek değerde yüksektir
+        for score_col, (feature_col, inverted) in self._SCORE_COLUMNS.items():
+            values = rfm_scored[feature_col].to_numpy(dtype=np.float64)
+            if fit:
+                self.score_edges[score_col] = np.quantile(values, [0.2, 0.4, 0.6, 0.8])
+            scores = self._quintile_scores(values, self.score_edges[score_col])
+            rfm_scored[score_col] = 6 - scores if inverted else scores
         
         # Genel RFM skoru
         rfm_scored['rfm_score'] = (
@@ -290,11 +595,12 @@ class RFMFeatureEngineer:
             rfm_scored['monetary_score']
         )
         
-        # RFM segmenti (basitleştirilmiş)
-        rfm_scored['rfm_segment'] = pd.cut(
-            rfm_scored['rfm_score'],
-            bins=[0, 6, 9, 12, 15],
-            labels=['Risk Altında', 'Umut Veren', 'Sadık', 'Şampiyonlar']
+        # RFM segmenti (basitleştirilmiş): pd.cut(bins=[0, 6, 9, 12, 15]) ile aynı sağdan kapalı
+        # aralıklar; skor her zaman 3-15 arasında olduğundan kodlar doğrudan searchsorted ile bulunur
+        rfm_scored['rfm_segment'] = pd.Categorical.from_codes(
+            np.searchsorted([6, 9, 12], rfm_scored['rfm_score'].to_numpy(), side='left'),
+            categories=['Risk Altında', 'Umut Veren', 'Sadık', 'Şampiyonlar'],
+            ordered=True
         )
         
         logger.info(f"RFM skorları hesaplandı")
@@ -303,31 +609,81 @@ class RFMFeatureEngineer:
         
         return rfm_scored
     
+    @staticmethod
+    def _quintile_scores(values: np.ndarray, edges: np.ndarray) -> np.ndarray:
+        """
+        Değerleri 4 iç sınıra göre 1-5 arası beşli dilim skorlarına (int8) çevirir.
+        
+        Sınırlar np.quantile(values, [0.2, 0.4, 0.6, 0.8]) olduğunda pd.qcut(q=5) ile aynı
+        sonucu verir (sağdan kapalı aralıklar); ancak Categorical üretip tamsayıya geri
+        dönüştürmek yerine skorlar doğrudan np.searchsorted ile bulunur. Eşit sınırlarda
+        qcut'ın aksine hata verilmez, ilgili skor atlanır.
+        """
+        return (np.searchsorted(edges, values, side='left') + 1).astype(np.int8)
+    
     def get_feature_names(self) -> List[str]:
         """Özellik adlarının bir listesini döndürür."""
         return self.feature_names
 
 
+def _input_hash(orders_df: pd.DataFrame, order_products_df: pd.DataFrame) -> str:
+    """
+    RFM özelliklerinin bağlı olduğu girdi sütunlarının içerik özeti (blake2b, 128 bit).
+    
+    Sütun adı ve tipi de özete katılır; aynı değerler farklı tiplerle gelirse çıktı tipleri
+    değişebildiği için ayrı anahtar üretilir.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for df, columns in ((orders_df, ['user_id', 'order_id', 'order_number', 'days_since_prior_order']),
+                        (order_products_df, ['order_id', 'product_id'])):
+        for col in columns:
+            values = np.ascontiguousarray(df[col].to_numpy())
+            digest.update(f"{col}:{values.dtype}:{values.size};".encode())
+            digest.update(memoryview(values).cast('B'))
+    return digest.hexdigest()
+
+
 def create_rfm_features_pipeline(orders_df: pd.DataFrame,
-                                 order_products_df: pd.DataFrame) -> pd.DataFrame:
+                                 order_products_df: pd.DataFrame,
+                                 backend: str = 'pandas',
+                                 cache_dir: Optional[Path] = None) -> pd.DataFrame:
     """
     Tüm RFM özelliklerini oluşturmak için hızlı bir işlem hattı (pipeline).
     
     Args:
         orders_df: Siparişler veri çerçevesi.
         order_products_df: Sipariş ürünleri veri çerçevesi.
+        backend: 'pandas' (varsayılan) veya 'polars' (bkz. create_all_rfm_features).
+        cache_dir: Verilirse sonuç bu dizinde girdi içeriğinin özetiyle adlandırılan
+                   'rfm_<özet>.parquet' dosyasına yazılır; aynı girdilerle yapılan sonraki
+                   çağrılar hesaplama yapmadan bu dosyayı okur (varsayılan: önbellek yok).
         
     Returns:
         Kullanıcı düzeyinde RFM özellikleri ve skorları içeren bir veri çerçevesi.
     """
+    cache_path = None
+    if cache_dir is not None:
+        cache_path = Path(cache_dir) / f"rfm_{_input_hash(orders_df, order_products_df)}.parquet"
+        if cache_path.exists():
+            logger.info(f"RFM özellikleri önbellekten okunuyor: {cache_path}")
+            return pd.read_parquet(cache_path, engine='pyarrow')
+    
     engineer = RFMFeatureEngineer()
     
     # Özellikleri oluştur
-    rfm_features = engineer.create_all_rfm_features(orders_df, order_products_df)
+    rfm_features = engineer.create_all_rfm_features(orders_df, order_products_df, backend=backend)
     
     # RFM skorlarını ekle
     rfm_with_scores = engineer.create_rfm_score(rfm_features)
     
+    if cache_path is not None:
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            rfm_with_scores.to_parquet(cache_path, engine='pyarrow', compression='snappy', index=False)
+        except OSError as e:
+            # Önbellek yalnızca hızlandırma amaçlıdır; yazılamazsa hesaplanan sonuç döndürülür
+            logger.warning(f"RFM önbelleği yazılamadı ({cache_path}): {e}")
+    
     return rfm_with_scores
 
 
@@ -344,10 +700,8 @@ if __name__ == "__main__":
     data = loader.load_all_data()
     
     orders_df = data['orders']
-    order_products = pd.concat([
-        data['order_products_prior'],
-        data['order_products_train']
-    ])
+    # Yalnızca özelliklerin okuduğu sütunlar birleştirilir; kullanılmayan sütunlar kopyalanmaz
+    order_products = loader.merge_order_products(columns=['order_id', 'product_id'])
     
     # RFM özelliklerini oluştur
     rfm_features = create_rfm_features_pipeline(orders_df, order_products)
@@ -0,0 +1,165 @@
+"""
+Hiperparametre Optimizasyonu Modülü
+===================================
+OPTUNA_CONFIG'teki ortak depolama (RDB) üzerinden Optuna çalışmalarını oluşturur ve
+denemeleri ayrı süreçlerde paralel çalıştırır.
+
+Kullanım (işçi betiği, ör. tune_lgb.py):
+    from src.models.tuning import run_worker
+    run_worker(objective)
+
+Ana süreç:
+    from src.models.tuning import launch_optuna
+    study_name, return_codes = launch_optuna('tune_lgb.py', n_workers=4)
+
+Her çalıştırma kendi çalışmasını kullanır (ör. 'freshcart-tune_lgb-20260101-120000'); farklı
+modellerin denemeleri aynı çalışmaya karışmaz.
+"""
+
+import os
+import subprocess
+import sys
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple, Union
+
+import optuna
+from optuna.study import MaxTrialsCallback
+from optuna.trial import TrialState
+
+try:
+    from src.config import OPTUNA_CONFIG
+except ImportError:
+    # Notebook'lar 'src' dizinini yola ekleyip modülleri doğrudan içe aktarır
+    from config import OPTUNA_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# launch_optuna'nın çalışma adını işçi süreçlere aktardığı ortam değişkeni
+STUDY_NAME_ENV = 'FRESHCART_OPTUNA_STUDY'
+
+
+def make_study_name(model_name: str, run_id: Optional[str] = None) -> str:
+    """OPTUNA_CONFIG['study_prefix'], model adı ve (verilirse) çalıştırma kimliğinden çalışma adı üretir."""
+    parts = [OPTUNA_CONFIG['study_prefix'], model_name]
+    if run_id:
+        parts.append(run_id)
+    return '-'.join(parts)
+
+
+def build_pruner() -> optuna.pruners.BasePruner:
+    """OPTUNA_CONFIG['pruner'] tanımından budayıcıyı oluşturur ('cls' optuna.pruners içindeki sınıf adıdır)."""
+    pruner_cfg = dict(OPTUNA_CONFIG['pruner'])
+    pruner_cls = getattr(optuna.pruners, pruner_cfg.pop('cls'))
+    return pruner_cls(**pruner_cfg)
+
+
+def lgb_pruning_callback(trial: optuna.Trial, metric: str = 'auc'):
+    """
+    Her boosting turunda doğrulama metriğini denemeye raporlayan LightGBM geri çağrısı.
+
+    lgb.early_stopping ile birlikte tek bir doğrulama setinde kullanılmalıdır; çapraz
+    doğrulamada her kat aynı adımları yeniden raporlar.
+    """
+    # Optuna 3+ sürümlerinde entegrasyonlar ayrı pakettedir (optuna-integration)
+    try:
+        from optuna_integration import LightGBMPruningCallback
+    except ImportError:
+        from optuna.integration import LightGBMPruningCallback
+    return LightGBMPruningCallback(trial, metric)
+
+
+def create_study(study_name: str, direction: str = 'maximize') -> optuna.Study:
+    """
+    OPTUNA_CONFIG'teki depolama ve budayıcıyla study_name adlı çalışmayı oluşturur (varsa yükler).
+
+    Not: Örnekleyiciye sabit tohum verilmez; aksi halde tüm işçiler aynı parametreleri önerir.
+    """
+    return optuna.create_study(
+        direction=direction,
+        storage=OPTUNA_CONFIG['storage'],
+        study_name=study_name,
+        load_if_exists=OPTUNA_CONFIG['load_if_exists'],
+        pruner=build_pruner()
+    )
+
+
+def run_worker(objective: Callable[[optuna.Trial], float],
+               direction: str = 'maximize',
+               study_name: Optional[str] = None) -> optuna.Study:
+    """
+    Tek bir işçi sürecinde ortak çalışmaya deneme ekler.
+
+    Toplam tamamlanan deneme sayısı tüm işçiler genelinde OPTUNA_CONFIG['n_trials']
+    değerine ulaştığında durur.
+
+    Args:
+        objective: Optuna amaç fonksiyonu.
+        direction: Optimizasyon yönü.
+        study_name: Çalışma adı. Verilmezse launch_optuna'nın aktardığı ad, o da yoksa
+                    betik adından türetilen ad (make_study_name) kullanılır.
+    """
+    if study_name is None:
+        study_name = os.environ.get(STUDY_NAME_ENV) or make_study_name(Path(sys.argv[0]).stem)
+    study = create_study(study_name, direction)
+
+    # Devam edilen çalışma sınıra zaten ulaştıysa deneme yapılmaz; dönen sonuçlar eski
+    # denemelerdendir ve bu sessizce geçilmemelidir
+    n_complete = len(study.get_trials(deepcopy=False, states=(TrialState.COMPLETE,)))
+    if n_complete >= OPTUNA_CONFIG['n_trials']:
+        logger.warning(f"'{study_name}' çalışmasında zaten {n_complete} tamamlanmış deneme var "
+                       f"(sınır: {OPTUNA_CONFIG['n_trials']}); yeni deneme yapılmıyor. Yeni bir "
+                       f"arama için farklı bir study_name verin.")
+        return study
+    study.optimize(
+        objective,
+        n_jobs=OPTUNA_CONFIG['n_jobs'],
+        timeout=OPTUNA_CONFIG['timeout'],
+        callbacks=[MaxTrialsCallback(OPTUNA_CONFIG['n_trials'], states=(TrialState.COMPLETE,))]
+    )
+    return study
+
+
+def launch_optuna(worker_script: Union[str, Path], n_workers: int,
+                  direction: str = 'maximize',
+                  study_name: Optional[str] = None) -> Tuple[str, List[int]]:
+    """
+    worker_script'i çalıştıran n_workers adet süreç başlatır ve hepsinin bitmesini bekler.
+
+    Args:
+        worker_script: run_worker(...) çağıran Python betiğinin yolu.
+        n_workers: Paralel işçi süreç sayısı.
+        direction: Optimizasyon yönü (işçilerdeki run_worker ile aynı olmalı).
+        study_name: Çalışma adı. Verilmezse betik adı ve başlangıç zamanından yeni bir ad
+                    üretilir; önceki bir çalışmaya devam etmek için adı açıkça verin.
+
+    Returns:
+        (çalışma adı, işçilerin çıkış kodları). Sonuçlar optuna.load_study ile bu addan okunur.
+    """
+    if study_name is None:
+        study_name = make_study_name(Path(worker_script).stem,
+                                     datetime.now().strftime('%Y%m%d-%H%M%S'))
+
+    # Şema ve çalışma burada bir kez oluşturulur; aksi halde işçiler SQLite tablolarını
+    # aynı anda oluşturmaya çalışıp 'table already exists' hatası alır.
+    create_study(study_name, direction)
+
+    # Her işçiye çekirdeklerin eşit payı verilir; aksi halde her süreçteki OpenMP/BLAS
+    # havuzları tüm çekirdekleri ister ve işçi sayısıyla çarpılan aşırı abonelik oluşur
+    threads_per_worker = str(max(1, (os.cpu_count() or 1) // n_workers))
+    worker_env = os.environ.copy()
+    for var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        worker_env[var] = threads_per_worker
+    worker_env[STUDY_NAME_ENV] = study_name
+
+    logger.info(f"{n_workers} Optuna işçisi başlatılıyor ({threads_per_worker} iş parçacığı/işçi, "
+                f"çalışma: {study_name}): {worker_script}")
+    procs = [subprocess.Popen([sys.executable, str(worker_script)], env=worker_env)
+             for _ in range(n_workers)]
+    return_codes = [proc.wait() for proc in procs]
+
+    failed = [code for code in return_codes if code != 0]
+    if failed:
+        logger.warning(f"{len(failed)} işçi hata koduyla sonlandı: {failed}")
+    return study_name, return_codes
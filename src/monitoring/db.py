@@ -1,5 +1,6 @@
 # src/monitoring/db.py
 import sqlite3
+from contextlib import closing
 import pandas as pd
 from datetime import datetime
 import sys
@@ -16,9 +17,17 @@ except ImportError:
 
 DB_PATH = PROCESSED_DATA_DIR / 'monitoring.db'
 
+INSERT_PREDICTION_QUERY = '''
+    INSERT INTO predictions 
+    (user_id, purchase_velocity, days_since_last_order, predicted_prob, predicted_label, model_version)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
 def get_connection():
     """Creates a SQLite database connection."""
     conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    # WAL modunda her commit'te tam fsync gerekmez (bağlantı başına ayar)
+    conn.execute('PRAGMA synchronous=NORMAL')
     return conn
 
 def init_db():
@@ -29,6 +38,9 @@ def init_db():
     conn = get_connection()
     cursor = conn.cursor()
     
+    # Write-Ahead Logging: kalıcı ayar, veritabanı dosyasında saklanır
+    cursor.execute('PRAGMA journal_mode=WAL')
+    
     # Prediction Logs Table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS predictions (
@@ -45,34 +57,55 @@ def init_db():
             model_version TEXT
         )
     ''')
+    # İzleme sayfası en yeni kayıtları okur; sıralama için indeks
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_pred_ts ON predictions(timestamp DESC)')
     conn.commit()
     conn.close()
     print(f"✅ Monitoring DB initialized at {DB_PATH}")
 
+def make_log_row(user_id, features, prob, label, model_version='v1'):
+    """Builds the insert tuple for a single prediction log."""
+    # features can be a dictionary or a dataframe row
+    return (
+        user_id,
+        features.get('purchase_velocity', 0),
+        features.get('days_since_last_order', 0),
+        prob,
+        int(label),
+        model_version
+    )
+
+def log_predictions(rows):
+    """Logs a batch of prediction rows (see make_log_row) in a single transaction."""
+    if not rows:
+        return
+    try:
+        # closing(): bağlantı executemany hata verse de kapanır ('with conn' yalnızca commit/rollback yapar)
+        with closing(get_connection()) as conn, conn:
+            conn.executemany(INSERT_PREDICTION_QUERY, rows)
+    except sqlite3.Error as e:
+        print(f"❌ Error logging predictions: {e}")
+
 def log_prediction(user_id, features, prob, label, model_version='v1'):
     """Logs a prediction to the database."""
-    try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        query = '''
-            INSERT INTO predictions 
-            (user_id, purchase_velocity, days_since_last_order, predicted_prob, predicted_label, model_version)
-            VALUES (?, ?, ?, ?, ?, ?)
-        '''
-        # features can be a dictionary or a dataframe row
-        cursor.execute(query, (
-            user_id,
-            features.get('purchase_velocity', 0),
-            features.get('days_since_last_order', 0),
-            prob,
-            int(label),
-            model_version
-        ))
-        conn.commit()
-        conn.close()
-    except Exception as e:
-        print(f"❌ Error logging prediction: {e}")
+    log_predictions([make_log_row(user_id, features, prob, label, model_version)])
+
+def get_prediction_kpis(conn):
+    """Returns (total, churn_rate, avg_prob, last_timestamp) aggregated inside SQLite."""
+    return conn.execute('''
+        SELECT COUNT(*), AVG(predicted_label), AVG(predicted_prob), MAX(timestamp)
+        FROM predictions
+    ''').fetchone()
+
+def get_recent_predictions(conn, limit=5000):
+    """Returns the most recent `limit` prediction logs as a DataFrame."""
+    # Zaman damgaları okuma sırasında tek seferde datetime64'e çevrilir
+    return pd.read_sql(
+        "SELECT * FROM predictions ORDER BY timestamp DESC LIMIT ?",
+        conn,
+        params=(limit,),
+        parse_dates=['timestamp']
+    )
 
 # Initialize DB (when running this file directly)
 if __name__ == "__main__":
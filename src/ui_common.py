@@ -0,0 +1,309 @@
+"""
+Streamlit Arayüzü Ortak Bileşenleri
+===================================
+Model/veri yükleme, tahmin, SHAP açıklaması ve tema gibi sayfalar arasında
+paylaşılan yardımcılar. Modül süreç başına bir kez içe aktarıldığı için
+st.cache_* önbellekleri tüm yeniden çalıştırmalarda ortaktır.
+"""
+
+import streamlit as st
+import pandas as pd
+import numpy as np
+import joblib
+import json
+import pyarrow.parquet as pq
+import logging
+
+# İsteğe bağlı: orjson, standart json'dan birkaç kat hızlı C ayrıştırıcısıdır
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from src.config import PROCESSED_DATA_DIR, MODEL_DIR, PLOT_DIR, LOG_DIR, LOGGING_CONFIG
+
+# --- HATA GÜNLÜĞÜ ---
+# Yakalanan hatalar sessizce yutulmak yerine logs/app.log dosyasına yazılır.
+# Modül yeniden yüklenirse işleyicinin iki kez eklenmemesi için korunur.
+logger = logging.getLogger("freshcart.app")
+if not logger.handlers:
+    _log_handler = logging.FileHandler(LOG_DIR / 'app.log', encoding='utf-8')
+    _log_handler.setFormatter(logging.Formatter(LOGGING_CONFIG['format']))
+    logger.addHandler(_log_handler)
+    logger.setLevel(logging.INFO)
+
+# Tahmin günlüklerinde ve önbellek anahtarlarında kullanılan model sürümü
+MODEL_VERSION = 'v1.0.3'
+
+# --- YÜKSEK KONTRASTLI KOYU TEMA CSS ---
+APP_CSS = """
+<style>
+    /* Genel Ayarlar (Ana Uygulama) */
+    .stApp {
+        background-color: #0e1117;
+        color: #ffffff;
+    }
+    
+    /* --- KENAR ÇUBUĞU DÜZELTMESİ --- */
+    [data-testid="stSidebar"] {
+        background-color: #161b22 !important;
+        border-right: 1px solid #30363d;
+    }
+    
+    /* Kenar Çubuğundaki tüm metinleri beyaz yap */
+    [data-testid="stSidebar"] * {
+        color: #e6edf3 !important;
+    }
+
+    /* --- RADYO BUTONU VE ONAY KUTUSU METİNLERİ --- */
+    .stRadio label span, .stRadio label p {
+        color: #ffffff !important;
+        font-size: 1rem;
+    }
+    .stRadio > label {
+        color: #ffffff !important;
+        font-weight: bold;
+        font-size: 1.1rem;
+    }
+    div[role="radiogroup"] {
+        color: #ffffff !important;
+    }
+
+    /* --- DİĞER ELEMANLAR --- */
+    .stSelectbox label {
+        color: #ffffff !important;
+        font-weight: bold;
+    }
+    .stSelectbox > div > div {
+        background-color: #21262d !important;
+        color: #ffffff !important;
+        border: 1px solid #58a6ff;
+    }
+    
+    /* Özel Bilgi Kutusu */
+    .info-box {
+        background-color: #1f2937;
+        border: 1px solid #58a6ff;
+        padding: 1.5rem;
+        border-radius: 5px;
+        margin-bottom: 2rem;
+    }
+    .info-box h4 {
+        color: #58a6ff !important;
+        margin-top: 0;
+    }
+    .info-box p {
+        color: #e5e7eb !important;
+        margin-bottom: 0;
+    }
+
+    /* Metrik Kartları */
+    div[data-testid="stMetric"] {
+        background-color: #21262d;
+        border: 1px solid #484f58;
+        padding: 15px;
+        border-radius: 10px;
+    }
+    div[data-testid="stMetric"] label {
+        color: #8b949e !important;
+    }
+    div[data-testid="stMetric"] div[data-testid="stMetricValue"] {
+        color: #ffffff !important;
+    }
+
+    /* Başlık Düzeltmesi */
+    header[data-testid="stHeader"] {
+        background-color: #0e1117 !important;
+    }
+    
+    /* Başlıklar */
+    h1, h2, h3 {
+        color: #58a6ff !important;
+    }
+    /* Genel Paragraf Metinleri */
+    p {
+        color: #e6edf3;
+    }
+</style>
+"""
+
+# --- KENAR ÇUBUĞU ALT BİLGİSİ ---
+SIDEBAR_FOOTER_HTML = """
+### Geliştiren
+<div style="margin-top: -10px;">
+    <h4 style="margin-bottom: 0px; color: #ffffff;">Murat IYIGUN</h4>
+    <p style="margin-top: 0px; font-size: 0.9rem; color: #8b949e; font-style: italic;">
+        Veri Bilimci & Yapay Zeka Mühendisi
+    </p>
+</div>
+"""
+
+def inject_css():
+    """
+    Tema CSS'ini sayfaya enjekte eder.
+    Not: Streamlit, bir çalıştırmada yayınlanmayan öğeleri sayfadan kaldırır; bu yüzden
+    stil bloğu session_state ile tek seferlik değil, her çalıştırmada enjekte edilmelidir.
+    """
+    st.markdown(APP_CSS, unsafe_allow_html=True)
+
+
+# --- MODEL / VERİ / AÇIKLAMA ---
+def read_json(path):
+    """JSON dosyasını orjson (varsa) veya standart json ile okur."""
+    raw = path.read_bytes()
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+@st.cache_resource
+def load_artifacts():
+    """Eğitilmiş modeli ve gerekli meta verileri yükler."""
+    # 1. Modeli Yükle
+    try:
+        model = joblib.load(MODEL_DIR / 'final_model_optimized.pkl')
+    except FileNotFoundError:
+        st.error("Model dosyası (final_model_optimized.pkl) models dizininde bulunamadı.")
+        st.stop()
+    
+    # 2. Özellik Adlarını Yükle
+    # Uygulama önce models/feature_names.json'a, sonra processed/model_features.json'a bakar
+    feature_names = []
+    feature_file_used = ""
+    
+    try:
+        path_primary = MODEL_DIR / 'feature_names.json'
+        path_secondary = PROCESSED_DATA_DIR / 'model_features.json'
+        
+        if path_primary.exists():
+            feature_names = read_json(path_primary)
+            feature_file_used = "models/feature_names.json"
+        elif path_secondary.exists():
+            feature_names = read_json(path_secondary)
+            feature_file_used = "data/processed/model_features.json"
+        else:
+            st.error("Özellik listesi JSON dosyası models/ veya data/processed/ dizininde bulunamadı.")
+            st.stop()
+            
+    except (OSError, json.JSONDecodeError) as e:
+        logger.exception("Özellik adları yüklenemedi")
+        st.error(f"Özellik adları yüklenirken hata: {e}")
+        st.stop()
+        
+    # 3. Veriyi Yükle
+    try:
+        data_path = PROCESSED_DATA_DIR / 'final_features_advanced.parquet'
+        # Dosyayı belleğe eşle; şema altbilgiden okunur, veri sayfaları henüz çözülmez
+        parquet_file = pq.ParquetFile(data_path, memory_map=True)
+        # Üyelik kontrolleri O(1) olsun diye küme olarak tutulur
+        available_cols = set(parquet_file.schema_arrow.names)
+        
+        # Geç KeyErrors'ı önlemek için Sütunları hemen doğrula
+        missing_cols = [col for col in feature_names if col not in available_cols]
+        if missing_cols:
+            st.warning(f"Veri Uyuşmazlığı tespit edildi! '{feature_file_used}' içindeki özellik listesi, parke dosyasında bulunmayan sütunlar bekliyor: {missing_cols}")
+            # Güvenli mod: Sadece gerçekten var olan sütunları tut
+            feature_names = [col for col in feature_names if col in available_cols]
+        
+        # Müşteri seçimi ve indeks user_id'ye dayanır; yoksa veri olmadan devam edilir
+        # (ValueError aşağıda yakalanır, açık bir hata mesajı gösterilir)
+        if 'user_id' not in available_cols:
+            raise ValueError(f"'{data_path.name}' dosyasında user_id sütunu bulunamadı")
+        
+        # Uygulama yalnızca user_id ve model özelliklerini kullanır (is_churn gerekmez).
+        # feature_names zaten süzüldü.
+        cols_to_keep = ['user_id'] + feature_names
+        
+        # Sütun projeksiyonu: kullanılmayan sütunlar diskten hiç okunmaz.
+        # self_destruct, Arrow tamponlarını pandas bloklarına dönüştükçe serbest bırakır.
+        data = parquet_file.read(columns=cols_to_keep, use_threads=True).to_pandas(
+            self_destruct=True, split_blocks=True
+        )
+        
+        # Tıklama başına O(N) maske taraması yerine O(1) indeks araması için. Sıralanmaz:
+        # benzersiz indekste get_loc sırasız da çalışır ve ID listesi dosya sırasında kalır
+        data = data.set_index('user_id', drop=False)
+        
+    except FileNotFoundError:
+        st.warning("Parquet verisi bulunamadı. Uygulama sadece Model Modunda çalışacak (geçmiş veri yok).")
+        data = pd.DataFrame()
+    except (OSError, ValueError) as e:
+        # OSError: okuma/IO hataları, ValueError: pyarrow ArrowInvalid (bozuk/uyumsuz şema)
+        logger.exception("Parquet verisi yüklenemedi")
+        st.error(f"Veri yüklenirken hata: {e}")
+        data = pd.DataFrame()
+
+    # Tahmin yolu için bitişik özellik matrisi (satır sırası data.index ile aynı).
+    # float64 tutulur: float32 yuvarlaması ağaç eşiklerini aşıp olasılıkları kaydırıyor.
+    X = data[feature_names].to_numpy(dtype=np.float64) if not data.empty else np.empty((0, len(feature_names)))
+
+    return model, feature_names, data, X
+
+@st.cache_resource
+def get_explainer(_model):
+    """
+    SHAP açıklayıcısını süreç başına bir kez oluşturur (model hash'lenmez).
+    Öncelik sırası: GPUTree (CUDA varsa) -> FastTreeSHAP v2 -> standart TreeExplainer.
+    """
+    # shap ağır bir içe aktarmadır (numba/llvmlite); yalnızca ilk açıklamada yüklenir
+    import shap
+
+    # 1. GPU yolu: shap CUDA uzantısıyla (_cext_gpu) derlenmişse ağaç gezinimi GPU'da yapılır.
+    # GPUTree çekirdeği ilk açıklamada çağırdığından tek satırlık bir deneme yapılır; aksi
+    # halde destek eksikliği sonraki her explain() çağrısında hata olarak ortaya çıkar.
+    try:
+        import shap._cext_gpu  # noqa: F401
+        gpu_explainer = shap.explainers.GPUTree(_model, feature_perturbation="tree_path_dependent")
+        n_features = getattr(_model, 'booster_', _model).num_feature()
+        gpu_explainer.shap_values(np.zeros((1, n_features)))
+        return gpu_explainer
+    except Exception:
+        logger.info("SHAP GPU desteği kullanılamıyor; CPU açıklayıcısına geçiliyor", exc_info=True)
+
+    # 2. FastTreeSHAP v2: ağaç başına katkı tablolarını önceden hesaplar.
+    # Tek satırlık açıklamalar için tek iş parçacığı (predict_churn ile aynı politika)
+    try:
+        import fasttreeshap
+        return fasttreeshap.TreeExplainer(_model, algorithm="v2", n_jobs=1)
+    except ImportError:
+        pass
+
+    # 3. Yedek: standart SHAP TreeExplainer
+    return shap.TreeExplainer(_model, feature_perturbation="tree_path_dependent")
+
+@st.cache_data(max_entries=512)
+def explain(uid: int, model_version: str, _explainer, _row: np.ndarray) -> np.ndarray:
+    """
+    Bir müşterinin SHAP değerlerini (uid, model_version) anahtarıyla önbelleğe alır.
+    Explanation nesnesi yerine düz bir (F,) dizi döndürür; grafik yalnızca değerleri kullanır.
+    """
+    vals = _explainer.shap_values(_row)
+    # Eski SHAP sürümleri ikili sınıflandırmada [negatif, pozitif] listesi döndürür
+    if isinstance(vals, list):
+        vals = vals[1]
+    return np.asarray(vals)[0]
+
+@st.cache_resource
+def load_png(filename: str) -> bytes:
+    """Statik grafik dosyasını süreç başına bir kez diskten okur."""
+    return (PLOT_DIR / filename).read_bytes()
+
+def show_plot(filename: str, missing_msg: str = "Görselleştirme mevcut değil.") -> bool:
+    """Önbellekteki PNG'yi gösterir; dosya yoksa bilgi mesajı basar."""
+    try:
+        st.image(load_png(filename), use_container_width=True)
+        return True
+    except OSError:
+        logger.warning("Grafik dosyası okunamadı: %s", filename, exc_info=True)
+        st.info(missing_msg)
+        return False
+
+@st.cache_data(max_entries=4096)
+def predict_churn(uid: int, model_version: str, _model, _row: np.ndarray) -> float:
+    """Bir müşterinin kayıp olasılığını (uid, model_version) anahtarıyla önbelleğe alır."""
+    # sklearn sarmalayıcısı veya ham Booster; şekil kontrolü atlanır (satır X'ten gelir).
+    # Tek satır için tek iş parçacığı: eşzamanlı oturumlara çekirdek bırakır.
+    booster = getattr(_model, 'booster_', _model)
+    return float(booster.predict(
+        _row,
+        num_iteration=booster.best_iteration or None,
+        predict_disable_shape_check=True,
+        num_threads=1
+    )[0])